@@ -0,0 +1,60 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ("sequences_per_second", "tokens_per_second", "p50", "p99", "peak_rss_mb")
+
+
+def _index(path: Path) -> tuple[dict, dict[tuple[str, int, str], dict]]:
+	report = json.loads(path.read_text())
+
+	results = {}
+	for result in report["results"]:
+		results[(result["model"], result["size"], result["stage"])] = {
+			**result,
+			**result["latency_ms"]
+		}
+
+	return report, results
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Compare two benchmark reports written by run.py.")
+	parser.add_argument("baseline", type=Path)
+	parser.add_argument("candidate", type=Path)
+	parser.add_argument("--threshold", type=float, default=0.1)
+	args = parser.parse_args()
+
+	baseline_report, baseline = _index(args.baseline)
+	candidate_report, candidate = _index(args.candidate)
+
+	print(f"baseline  {baseline_report['revision']}  {baseline_report['timestamp']}")
+	print(f"candidate {candidate_report['revision']}  {candidate_report['timestamp']}")
+
+	regressions = 0
+	for key in sorted(baseline.keys() & candidate.keys()):
+		changes = []
+		for metric in METRICS:
+			before = baseline[key][metric]
+			after = candidate[key][metric]
+			ratio = after / before if before else float("inf")
+			higher_is_better = metric.endswith("per_second")
+
+			flag = ""
+			if (higher_is_better and ratio < 1 - args.threshold) or (not higher_is_better and ratio > 1 + args.threshold):
+				flag = "!"
+				regressions += 1
+			changes.append(f"{metric} {ratio:.2f}x{flag}")
+
+		model, size, stage = key
+		print(f"{model:<16} {size:>5} {stage:<16} " + "  ".join(changes))
+
+	print(f"{regressions} metric(s) regressed by more than {args.threshold:.0%}")
+
+	if regressions:
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,80 @@
+import json
+import string
+from itertools import product
+from pathlib import Path
+
+from transformers import BertConfig, BertModel, GPT2Config, GPT2LMHeadModel
+from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def _bert_config(vocab_size: int) -> BertConfig:
+	return BertConfig(
+		vocab_size=vocab_size,
+		hidden_size=32,
+		num_hidden_layers=2,
+		num_attention_heads=2,
+		intermediate_size=64,
+		max_position_embeddings=1024
+	)
+
+
+def build_bert(output_path: Path) -> Path:
+	output_path.mkdir(parents=True, exist_ok=True)
+
+	characters = string.ascii_letters + string.digits
+	vocab = SPECIAL_TOKENS + list(characters + string.punctuation) + [f"##{c}" for c in characters]
+	(output_path / "vocab.txt").write_text("\n".join(vocab) + "\n")
+
+	BertModel(_bert_config(len(vocab))).save_pretrained(output_path)
+
+	return output_path
+
+
+def build_dnabert(
+	output_path: Path,
+	k: int = 6
+) -> Path:
+	output_path.mkdir(parents=True, exist_ok=True)
+
+	vocab = SPECIAL_TOKENS + ["".join(kmer) for kmer in product("ACGT", repeat=k)]
+	(output_path / "vocab.txt").write_text("\n".join(vocab) + "\n")
+	(output_path / "tokenizer_config.json").write_text(json.dumps({
+		"tokenizer_class": "BertTokenizer",
+		"do_lower_case": False
+	}))
+
+	BertModel(_bert_config(len(vocab))).save_pretrained(output_path)
+
+	return output_path
+
+
+def build_gpt2(output_path: Path) -> Path:
+	output_path.mkdir(parents=True, exist_ok=True)
+
+	vocab = {symbol: index for index, symbol in enumerate(bytes_to_unicode().values())}
+	vocab["<|endoftext|>"] = len(vocab)
+	(output_path / "vocab.json").write_text(json.dumps(vocab))
+	(output_path / "merges.txt").write_text("#version: 0.2\n")
+
+	config = GPT2Config(
+		vocab_size=len(vocab),
+		n_embd=32,
+		n_layer=2,
+		n_head=2,
+		n_positions=2048
+	)
+	GPT2LMHeadModel(config).save_pretrained(output_path)
+
+	return output_path
+
+
+def build_fixtures(output_dir: str | Path) -> dict[str, str]:
+	output_dir = Path(output_dir)
+
+	return {
+		"bert": str(build_bert(output_dir / "bert")),
+		"dnabert": str(build_dnabert(output_dir / "dnabert")),
+		"gpt2": str(build_gpt2(output_dir / "gpt2"))
+	}
@@ -0,0 +1,257 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from importlib import import_module
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import numpy as np
+from fixtures import build_fixtures
+from synthetic import (SEQUENCE_SIZES, exin_records, kmer_records,
+                       nucl_records, translation_records)
+
+MODELS: dict[str, tuple[str, str, str, Callable[..., list[dict]]]] = {
+	"exin-gpt": ("llms.exin_classifier.gpt", "ExInClassifierGPT", "gpt2", exin_records),
+	"exin-bert": ("llms.exin_classifier.bert", "ExInClassifierBERT", "bert", exin_records),
+	"exin-dnabert": ("llms.exin_classifier.dnabert", "ExInClassifierDNABERT", "dnabert", kmer_records),
+	"nucl-bert": ("llms.nucl_classifier.bert", "NuclBERT", "bert", nucl_records),
+	"nucl-bert-token": ("llms.nucl_classifier.bert_token", "NuclBERTToken", "bert", nucl_records),
+	"dna-gpt": ("llms.dna_translator.gpt", "DnaTranslatorGPT", "gpt2", translation_records)
+}
+
+
+def _peak_rss_mb() -> float:
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _summary(
+	latencies: list[float],
+	sequences: int,
+	tokens: int,
+	elapsed: float
+) -> dict[str, Any]:
+	latencies_ms = np.asarray(latencies) * 1000
+
+	return {
+		"sequences": sequences,
+		"tokens": tokens,
+		"seconds": elapsed,
+		"sequences_per_second": sequences / elapsed if elapsed else 0.0,
+		"tokens_per_second": tokens / elapsed if elapsed else 0.0,
+		"latency_ms": {
+			"mean": float(latencies_ms.mean()),
+			"p50": float(np.percentile(latencies_ms, 50)),
+			"p90": float(np.percentile(latencies_ms, 90)),
+			"p99": float(np.percentile(latencies_ms, 99))
+		},
+		"peak_rss_mb": _peak_rss_mb()
+	}
+
+
+STAGES = ("tokenization", "prepare_dataset", "generate")
+
+
+def _count_forward_tokens(model: Any) -> Callable[[], int]:
+	counter = {"tokens": 0}
+
+	def hook(
+		module: Any,
+		args: tuple,
+		kwargs: dict[str, Any]
+	) -> None:
+		input_ids = kwargs.get("input_ids", args[0] if args else None)
+		if input_ids is None:
+			return None
+
+		attention_mask = kwargs.get("attention_mask")
+		if attention_mask is None:
+			counter["tokens"] += input_ids.numel()
+		else:
+			# cached decoding feeds only the new tokens but the full mask
+			counter["tokens"] += int(attention_mask[:, -input_ids.shape[1]:].sum())
+
+	model.model.register_forward_pre_hook(hook, with_kwargs=True)
+
+	return lambda: counter["tokens"]
+
+
+def benchmark_stage(
+	name: str,
+	checkpoint: str,
+	stage: str,
+	size: int,
+	count: int,
+	batch_size: int,
+	seed: int,
+	threads: int | None
+) -> dict[str, Any]:
+	import datasets
+	import torch
+	import transformers
+
+	datasets.disable_progress_bars()
+	transformers.logging.set_verbosity_error()
+	if threads:
+		torch.set_num_threads(threads)
+
+	module_name, class_name, _, generator = MODELS[name]
+	model = getattr(import_module(module_name), class_name)(
+		checkpoint=checkpoint,
+		log_level="WARNING",
+		seed=seed
+	)
+	rng = np.random.default_rng((seed, size))
+	records = [model.build_input(**record) for record in generator(rng, count, size)]
+	result: dict[str, Any] = {
+		"model": name,
+		"size": size,
+		"stage": stage
+	}
+
+	if stage == "tokenization":
+		latencies = []
+		input_tokens = 0
+		start = time.perf_counter()
+		for record in records:
+			record_start = time.perf_counter()
+			for example in model._generate_examples([record]):
+				input_tokens += len(example["input_ids"])
+			latencies.append(time.perf_counter() - record_start)
+		elapsed = time.perf_counter() - start
+
+		return {**result, **_summary(latencies, len(records), input_tokens, elapsed)}
+
+	if stage == "prepare_dataset":
+		with tempfile.TemporaryDirectory() as cache_dir:
+			model.dataset_cache_dir = cache_dir
+			start = time.perf_counter()
+			prepared = model._prepare_dataset(records)
+			elapsed = time.perf_counter() - start
+
+			return {**result, **_summary([elapsed], len(records), int(sum(prepared["length"])), elapsed)}
+
+	processed_tokens = _count_forward_tokens(model)
+	latencies = []
+	start = time.perf_counter()
+	for batch_start in range(0, len(records), batch_size):
+		batch = records[batch_start:batch_start + batch_size]
+		batch_time = time.perf_counter()
+		model.generate_batch(batch, batch_size=batch_size)
+		latencies.append(time.perf_counter() - batch_time)
+	elapsed = time.perf_counter() - start
+
+	return {
+		**result,
+		"batch_size": batch_size,
+		**_summary(latencies, len(records), processed_tokens(), elapsed)
+	}
+
+
+def _git_revision() -> tuple[str | None, bool]:
+	try:
+		revision = subprocess.run(
+			["git", "rev-parse", "--short", "HEAD"],
+			cwd=ROOT,
+			capture_output=True,
+			text=True,
+			check=True
+		).stdout.strip()
+		dirty = bool(subprocess.run(
+			["git", "status", "--porcelain", "--untracked-files=no"],
+			cwd=ROOT,
+			capture_output=True,
+			text=True,
+			check=True
+		).stdout.strip())
+	except (OSError, subprocess.CalledProcessError):
+		return None, False
+
+	return revision, dirty
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Benchmark tokenization, dataset preparation and inference on tiny CPU models.")
+	parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+	parser.add_argument("--sizes", nargs="+", type=int, default=list(SEQUENCE_SIZES))
+	parser.add_argument("--count", type=int, default=16)
+	parser.add_argument("--batch-size", type=int, default=16)
+	parser.add_argument("--seed", type=int, default=1234)
+	parser.add_argument("--threads", type=int, default=None)
+	parser.add_argument("--checkpoint-dir", type=Path, default=None)
+	parser.add_argument("--output", type=Path, default=None)
+	args = parser.parse_args()
+
+	import torch
+	import transformers
+
+	revision, dirty = _git_revision()
+	timestamp = datetime.now(timezone.utc)
+
+	with tempfile.TemporaryDirectory() as temporary:
+		checkpoints = build_fixtures(args.checkpoint_dir or temporary)
+
+		results = []
+		context = multiprocessing.get_context("spawn")
+		for name in args.models:
+			print(f"Benchmarking {name}...", flush=True)
+			for size in args.sizes:
+				for stage in STAGES:
+					# a fresh process per measurement keeps peak RSS specific to it
+					with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+						results.append(executor.submit(
+							benchmark_stage,
+							name,
+							checkpoints[MODELS[name][2]],
+							stage,
+							size,
+							args.count,
+							args.batch_size,
+							args.seed,
+							args.threads
+						).result())
+
+	report = {
+		"revision": revision,
+		"dirty": dirty,
+		"timestamp": timestamp.isoformat(),
+		"platform": platform.platform(),
+		"python": platform.python_version(),
+		"torch": torch.__version__,
+		"transformers": transformers.__version__,
+		"threads": args.threads or torch.get_num_threads(),
+		"config": {
+			"sizes": args.sizes,
+			"count": args.count,
+			"batch_size": args.batch_size,
+			"seed": args.seed
+		},
+		"results": results
+	}
+
+	output = args.output or ROOT / "benchmarks" / "results" / f"{revision or 'local'}-{timestamp:%Y%m%dT%H%M%S}.json"
+	output.parent.mkdir(parents=True, exist_ok=True)
+	output.write_text(json.dumps(report, indent=2))
+
+	for result in results:
+		print(
+			f"{result['model']:<16} {result['size']:>5} {result['stage']:<16} "
+			f"{result['sequences_per_second']:>10.1f} seq/s {result['tokens_per_second']:>12.1f} tok/s "
+			f"p50 {result['latency_ms']['p50']:>9.2f} ms  rss {result['peak_rss_mb']:>8.1f} MB"
+		)
+	print(f"Results written to '{output}'")
+
+
+if __name__ == "__main__":
+	main()
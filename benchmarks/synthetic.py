@@ -0,0 +1,89 @@
+import numpy as np
+
+SEQUENCE_SIZES = (256, 512, 950, 2000)
+
+NUCLEOTIDES = np.frombuffer(b"ACGT", dtype=np.uint8)
+AMINO_ACIDS = np.frombuffer(b"ACDEFGHIKLMNPQRSTVWY", dtype=np.uint8)
+REGION_LABELS = np.frombuffer(b"EIU", dtype=np.uint8)
+ORGANISMS = ("Homo sapiens", "Mus musculus", "Danio rerio", "Arabidopsis thaliana")
+
+
+def random_string(
+	rng: np.random.Generator,
+	alphabet: np.ndarray,
+	length: int
+) -> str:
+	return alphabet[rng.integers(0, len(alphabet), length)].tobytes().decode("ascii")
+
+
+def random_dna(
+	rng: np.random.Generator,
+	length: int
+) -> str:
+	return random_string(rng, NUCLEOTIDES, length)
+
+
+def random_regions(
+	rng: np.random.Generator,
+	length: int,
+	mean_run: int = 120
+) -> str:
+	runs = []
+	total = 0
+	while total < length:
+		run = int(rng.integers(1, 2 * mean_run))
+		runs.append(REGION_LABELS[rng.integers(0, len(REGION_LABELS))].tobytes() * run)
+		total += run
+
+	return b"".join(runs)[:length].decode("ascii")
+
+
+def exin_records(
+	rng: np.random.Generator,
+	count: int,
+	size: int
+) -> list[dict]:
+	return [{
+		"sequence": random_dna(rng, size),
+		"target": "EXON" if rng.random() < 0.5 else "INTRON",
+		"organism": ORGANISMS[rng.integers(0, len(ORGANISMS))],
+		"gene": f"gene{rng.integers(0, 1000)}",
+		"before": random_dna(rng, 25),
+		"after": random_dna(rng, 25),
+		"hide_prob": 0.0
+	} for _ in range(count)]
+
+
+def kmer_records(
+	rng: np.random.Generator,
+	count: int,
+	size: int
+) -> list[dict]:
+	return [{
+		"sequence": random_dna(rng, size),
+		"target": "EXON" if rng.random() < 0.5 else "INTRON"
+	} for _ in range(count)]
+
+
+def nucl_records(
+	rng: np.random.Generator,
+	count: int,
+	size: int
+) -> list[dict]:
+	return [{
+		"sequence": random_dna(rng, size),
+		"target": random_regions(rng, size),
+		"organism": ORGANISMS[rng.integers(0, len(ORGANISMS))]
+	} for _ in range(count)]
+
+
+def translation_records(
+	rng: np.random.Generator,
+	count: int,
+	size: int
+) -> list[dict]:
+	return [{
+		"sequence": random_dna(rng, size - size % 3),
+		"target": random_string(rng, AMINO_ACIDS, size // 3),
+		"organism": ORGANISMS[rng.integers(0, len(ORGANISMS))]
+	} for _ in range(count)]
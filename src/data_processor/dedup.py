@@ -0,0 +1,155 @@
+import hashlib
+import sqlite3
+from pathlib import Path
+from types import TracebackType
+from typing import Iterable
+
+
+def sequence_digest(
+	sequence: str,
+	organism: str
+) -> bytes:
+	digest = hashlib.blake2b(digest_size=16)
+	digest.update(organism.encode("utf-8"))
+	digest.update(b"\0")
+	digest.update(sequence.encode("ascii", errors="replace"))
+	return digest.digest()
+
+
+class SequenceDeduplicator:
+	def __init__(
+		self,
+		path: str | Path | None = None,
+		commit_every: int = 10_000
+	) -> None:
+		self.path = Path(path) if path is not None else None
+		self.commit_every = commit_every
+		self._pending = 0
+
+		if self.path is not None:
+			self.path.parent.mkdir(parents=True, exist_ok=True)
+
+		self._connection = sqlite3.connect(str(self.path) if self.path is not None else ":memory:")
+		self._connection.execute("PRAGMA journal_mode=WAL")
+		self._connection.execute("PRAGMA synchronous=NORMAL")
+		self._connection.executescript("""
+			CREATE TABLE IF NOT EXISTS digests (
+				digest BLOB PRIMARY KEY,
+				accession TEXT NOT NULL
+			) WITHOUT ROWID;
+			CREATE INDEX IF NOT EXISTS digests_accession ON digests (accession);
+			DROP TABLE IF EXISTS duplicates;
+			CREATE TABLE IF NOT EXISTS duplicate_accessions (
+				accession TEXT PRIMARY KEY,
+				digest BLOB NOT NULL,
+				organism TEXT NOT NULL
+			) WITHOUT ROWID;
+			CREATE INDEX IF NOT EXISTS duplicate_accessions_digest ON duplicate_accessions (digest);
+		""")
+
+	def __enter__(self) -> "SequenceDeduplicator":
+		return self
+
+	def __exit__(
+		self,
+		exc_type: type[BaseException] | None,
+		exc: BaseException | None,
+		traceback: TracebackType | None
+	) -> None:
+		self.close()
+
+	def __len__(self) -> int:
+		return self._connection.execute("SELECT COUNT(*) FROM digests").fetchone()[0]
+
+	def add(
+		self,
+		accession: str,
+		sequence: str,
+		organism: str
+	) -> bool:
+		digest = sequence_digest(sequence, organism)
+		cursor = self._connection.execute(
+			"INSERT OR IGNORE INTO digests (digest, accession) VALUES (?, ?)",
+			(digest, accession)
+		)
+		is_new = cursor.rowcount == 1
+
+		if not is_new:
+			owner = self._connection.execute(
+				"SELECT accession FROM digests WHERE digest = ?",
+				(digest,)
+			).fetchone()[0]
+			is_new = owner == accession
+
+		if not is_new:
+			self._connection.execute(
+				"INSERT OR REPLACE INTO duplicate_accessions (accession, digest, organism) VALUES (?, ?, ?)",
+				(accession, digest, organism)
+			)
+
+		self._pending += 1
+		if self._pending >= self.commit_every:
+			self.commit()
+
+		return is_new
+
+	def remove_accessions(
+		self,
+		accessions: Iterable[str]
+	) -> list[str]:
+		removed = set(accessions)
+
+		self._connection.executemany(
+			"DELETE FROM duplicate_accessions WHERE accession = ?",
+			((accession,) for accession in removed)
+		)
+
+		promoted = []
+		for accession in removed:
+			freed = self._connection.execute(
+				"SELECT digest FROM digests WHERE accession = ?",
+				(accession,)
+			).fetchall()
+
+			for (digest,) in freed:
+				successor = self._connection.execute(
+					"SELECT accession FROM duplicate_accessions WHERE digest = ? ORDER BY accession LIMIT 1",
+					(digest,)
+				).fetchone()
+
+				if successor is None:
+					self._connection.execute("DELETE FROM digests WHERE digest = ?", (digest,))
+					continue
+
+				self._connection.execute(
+					"UPDATE digests SET accession = ? WHERE digest = ?",
+					(successor[0], digest)
+				)
+				self._connection.execute(
+					"DELETE FROM duplicate_accessions WHERE accession = ?",
+					successor
+				)
+				promoted.append(successor[0])
+
+		self.commit()
+
+		return promoted
+
+	def reset(self) -> None:
+		self._connection.execute("DELETE FROM digests")
+		self._connection.execute("DELETE FROM duplicate_accessions")
+		self.commit()
+
+	def duplicate_counts(self) -> dict[str, int]:
+		return dict(self._connection.execute(
+			"SELECT organism, COUNT(*) AS count FROM duplicate_accessions "
+			"GROUP BY organism ORDER BY count DESC"
+		).fetchall())
+
+	def commit(self) -> None:
+		self._connection.commit()
+		self._pending = 0
+
+	def close(self) -> None:
+		self.commit()
+		self._connection.close()
@@ -0,0 +1,200 @@
+import hashlib
+import mmap
+import os
+import re
+from typing import Iterable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RECORD_END = re.compile(rb"^//[ \t\r]*$", re.M)
+LOCUS = re.compile(rb"^LOCUS +(\S+)", re.M)
+ACCESSION = re.compile(rb"^ACCESSION +(\S+)", re.M)
+VERSION = re.compile(rb"^VERSION +(\S+)", re.M)
+ORGANISM = re.compile(rb"^ {2}ORGANISM +(.+?)\r?$", re.M)
+FEATURES = re.compile(rb"^FEATURES ", re.M)
+FEATURES_END = re.compile(rb"^(?:ORIGIN|CONTIG|BASE COUNT)", re.M)
+FEATURE_KEY = re.compile(rb"^ {5}(\S+)", re.M)
+
+COUNTED_FEATURES = ("CDS", "exon", "intron")
+
+SCHEMA = pa.schema([
+	("accession", pa.string()),
+	("organism", pa.dictionary(pa.int32(), pa.string())),
+	("offset", pa.int64()),
+	("length", pa.int64()),
+	("features", pa.int32()),
+	("cds", pa.int32()),
+	("exon", pa.int32()),
+	("intron", pa.int32()),
+	("digest", pa.string())
+])
+
+
+def _search(
+	pattern: re.Pattern,
+	data: mmap.mmap,
+	start: int,
+	end: int
+) -> str:
+	match = pattern.search(data, start, end)
+	return match.group(1).decode("utf-8", errors="replace") if match else ""
+
+
+class GenBankIndex:
+	def __init__(
+		self,
+		table: pa.Table
+	) -> None:
+		self.table = table
+		self.accessions: list[str] = table["accession"].to_pylist()
+		self.offsets = table["offset"].to_numpy()
+		self.lengths = table["length"].to_numpy()
+		self.digests: list[str] = table["digest"].to_pylist()
+
+		self._rows: dict[str, int] = {}
+		for row, accession in enumerate(self.accessions):
+			self._rows.setdefault(accession, row)
+			self._rows.setdefault(accession.split(".")[0], row)
+
+	def __len__(self) -> int:
+		return len(self.accessions)
+
+	def __contains__(
+		self,
+		accession: str
+	) -> bool:
+		return accession in self._rows
+
+	@classmethod
+	def build(
+		cls,
+		annotations_file_path: str
+	) -> "GenBankIndex":
+		columns: dict[str, list] = {name: [] for name in SCHEMA.names}
+
+		if os.path.getsize(annotations_file_path) == 0:
+			return cls(pa.Table.from_pydict(columns, schema=SCHEMA))
+
+		with open(annotations_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+			start = 0
+			for end_match in RECORD_END.finditer(data):
+				end = end_match.end()
+				if end < len(data) and data[end:end + 1] == b"\n":
+					end += 1
+
+				locus = LOCUS.search(data, start, end)
+				if locus is None:
+					start = end
+					continue
+
+				record_start = locus.start()
+				accession = (
+					_search(VERSION, data, record_start, end)
+					or _search(ACCESSION, data, record_start, end)
+					or locus.group(1).decode("utf-8", errors="replace")
+				)
+
+				counts = dict.fromkeys(COUNTED_FEATURES, 0)
+				features = 0
+				features_start = FEATURES.search(data, record_start, end)
+				body_start = features_start.start() if features_start else record_start
+				if features_start is not None:
+					features_end = FEATURES_END.search(data, features_start.end(), end)
+					for key in FEATURE_KEY.finditer(data, features_start.end(), features_end.start() if features_end else end):
+						features += 1
+						name = key.group(1).decode("ascii", errors="replace")
+						if name in counts:
+							counts[name] += 1
+
+				columns["accession"].append(accession)
+				columns["organism"].append(_search(ORGANISM, data, record_start, end))
+				columns["offset"].append(record_start)
+				columns["length"].append(end - record_start)
+				columns["features"].append(features)
+				for name in COUNTED_FEATURES:
+					columns[name.lower()].append(counts[name])
+				columns["digest"].append(hashlib.blake2b(
+					accession.encode() + b"\0" + data[body_start:end],
+					digest_size=16
+				).hexdigest())
+
+				start = end
+
+		return cls(pa.Table.from_pydict(columns, schema=SCHEMA))
+
+	@classmethod
+	def load(
+		cls,
+		index_path: str
+	) -> "GenBankIndex":
+		return cls(pq.read_table(index_path, schema=SCHEMA))
+
+	@classmethod
+	def load_or_build(
+		cls,
+		annotations_file_path: str,
+		index_path: str | None = None
+	) -> "GenBankIndex":
+		index_path = index_path or f"{annotations_file_path}.index.parquet"
+
+		if (
+			os.path.exists(index_path)
+			and os.path.getmtime(index_path) >= os.path.getmtime(annotations_file_path)
+			and pq.read_schema(index_path).names == SCHEMA.names
+		):
+			return cls.load(index_path)
+
+		index = cls.build(annotations_file_path)
+		index.save(index_path)
+		return index
+
+	def save(
+		self,
+		index_path: str
+	) -> None:
+		pq.write_table(self.table, index_path, compression="zstd")
+
+	def rows(
+		self,
+		accessions: Iterable[str]
+	) -> list[int]:
+		rows = []
+		missing = []
+		for accession in accessions:
+			row = self._rows.get(accession)
+			if row is None:
+				missing.append(accession)
+			else:
+				rows.append(row)
+
+		if missing:
+			raise KeyError(f"Accessions not found in the index: {', '.join(missing[:10])}")
+
+		return rows
+
+	def byte_ranges(
+		self,
+		rows: Iterable[int],
+		max_size: int | None = None
+	) -> list[tuple[int, int]]:
+		ranges: list[tuple[int, int]] = []
+		for row in sorted(set(rows)):
+			start = int(self.offsets[row])
+			end = start + int(self.lengths[row])
+			if (
+				ranges
+				and ranges[-1][1] == start
+				and (max_size is None or end - ranges[-1][0] <= max_size)
+			):
+				ranges[-1] = (ranges[-1][0], end)
+			else:
+				ranges.append((start, end))
+		return ranges
+
+	def shard_rows(
+		self,
+		shard: tuple[int, int]
+	) -> range:
+		start, stop = shard
+		return range(max(start, 0), min(stop, len(self)))
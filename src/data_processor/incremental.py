@@ -0,0 +1,121 @@
+import shutil
+from pathlib import Path
+
+from data_processor.dedup import SequenceDeduplicator
+from data_processor.genbank_index import GenBankIndex
+from data_processor.manifest import ExtractionManifest
+from data_processor.parquet_writer import (SCHEMAS, ParquetDatasetWriter,
+                                           drop_accessions, next_partition)
+from data_processor.raw_extractor import extract_data
+from data_processor.sequence_store import SequenceStoreWriter
+
+
+def refresh_dataset(
+	annotations_file_path: str,
+	output_dir: str,
+	manifest_path: str | None = None,
+	dedup_path: str | None = None,
+	index_path: str | None = None,
+	store_path: str | None = None,
+	flanks_max_length = 25,
+	num_workers: int | None = None,
+	chunk_size: int = 2000,
+	records_per_partition: int = 100_000
+) -> tuple[list[str], list[str]]:
+	manifest = ExtractionManifest(manifest_path or Path(output_dir) / "manifest.parquet")
+	index = GenBankIndex.load_or_build(annotations_file_path, index_path)
+
+	changed, removed = manifest.diff(index)
+	if not changed and not removed:
+		return changed, removed
+
+	start_partition = next_partition(output_dir)
+	stale = changed + removed
+
+	with (
+		SequenceDeduplicator(dedup_path or Path(output_dir) / "dedup.sqlite") as dedup,
+		SequenceStoreWriter(store_path or Path(output_dir) / "sequences", append=True) as store
+	):
+		# unchanged duplicates of a freed sequence take it over, so they are
+		# re-extracted to write the dna row their former owner carried
+		promoted = dedup.remove_accessions(stale)
+		stale += promoted
+		extract = changed + promoted
+
+		drop_accessions(
+			output_dir,
+			manifest.partitions(stale) | set(range(manifest.last_partition() + 1, start_partition)),
+			set(stale)
+		)
+		store.remove(stale)
+		manifest.remove(stale)
+		manifest.save()
+
+		with ParquetDatasetWriter(
+			output_dir,
+			chunk_size=chunk_size,
+			records_per_partition=records_per_partition,
+			start_partition=start_partition
+		) as writer:
+			for dna in extract_data(
+				annotations_file_path,
+				flanks_max_length=flanks_max_length,
+				num_workers=num_workers,
+				accessions=extract,
+				index_path=index_path
+			):
+				write_dna = dedup.add(dna["accession"], dna["sequence"], dna["organism"])
+				writer.write(dna, write_dna=write_dna)
+				if write_dna:
+					store.add(dna["accession"], dna["sequence"])
+
+	digests = dict(zip(index.accessions, index.digests))
+	for accession in extract:
+		manifest.update(accession, digests[accession], writer.accession_partitions.get(accession, -1))
+	manifest.save()
+
+	return changed, removed
+
+
+def build_dataset(
+	annotations_file_path: str,
+	output_dir: str,
+	manifest_path: str | None = None,
+	dedup_path: str | None = None,
+	index_path: str | None = None,
+	store_path: str | None = None,
+	flanks_max_length = 25,
+	num_workers: int | None = None,
+	chunk_size: int = 2000,
+	records_per_partition: int = 100_000
+) -> dict[str, int]:
+	manifest_path = manifest_path or str(Path(output_dir) / "manifest.parquet")
+	dedup_path = dedup_path or str(Path(output_dir) / "dedup.sqlite")
+	store_path = store_path or str(Path(output_dir) / "sequences")
+
+	# a full build is a refresh from an empty state, so it leaves the manifest
+	# the next refresh_dataset call diffs against
+	Path(manifest_path).unlink(missing_ok=True)
+	shutil.rmtree(store_path, ignore_errors=True)
+	for name in SCHEMAS:
+		for path in (Path(output_dir) / name).glob("part-*.parquet"):
+			path.unlink()
+
+	with SequenceDeduplicator(dedup_path) as dedup:
+		dedup.reset()
+
+	refresh_dataset(
+		annotations_file_path,
+		output_dir,
+		manifest_path=manifest_path,
+		dedup_path=dedup_path,
+		index_path=index_path,
+		store_path=store_path,
+		flanks_max_length=flanks_max_length,
+		num_workers=num_workers,
+		chunk_size=chunk_size,
+		records_per_partition=records_per_partition
+	)
+
+	with SequenceDeduplicator(dedup_path) as dedup:
+		return dedup.duplicate_counts()
@@ -0,0 +1,42 @@
+from bisect import bisect_right
+
+
+class IntervalIndex:
+	def __init__(
+		self,
+		intervals: list[tuple[int, int]]
+	) -> None:
+		order = sorted(range(len(intervals)), key=lambda i: intervals[i][0])
+
+		self._starts: list[int] = []
+		self._max_ends: list[int] = []
+		self._owners: list[int] = []
+
+		max_end = None
+		owner = -1
+		for i in order:
+			start, end = intervals[i]
+			if max_end is None or end > max_end:
+				max_end = end
+				owner = i
+
+			self._starts.append(start)
+			self._max_ends.append(max_end)
+			self._owners.append(owner)
+
+	def __len__(self) -> int:
+		return len(self._starts)
+
+	def find_containing(
+		self,
+		start: int,
+		end: int
+	) -> int | None:
+		position = bisect_right(self._starts, start)
+		if position == 0:
+			return None
+
+		if self._max_ends[position - 1] >= end:
+			return self._owners[position - 1]
+
+		return None
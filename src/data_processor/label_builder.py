@@ -0,0 +1,75 @@
+from typing import Sequence
+
+import numpy as np
+from pandas import DataFrame
+
+UNKNOWN = ord("U")
+EXON = ord("E")
+INTRON = ord("I")
+
+
+def build_label_tracks(
+	lengths: Sequence[int] | np.ndarray,
+	owners: Sequence[int] | np.ndarray,
+	starts: Sequence[int] | np.ndarray,
+	ends: Sequence[int] | np.ndarray,
+	types: Sequence[str] | np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+	lengths = np.asarray(lengths, dtype=np.int64)
+	owners = np.asarray(owners, dtype=np.int64)
+
+	offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+	np.cumsum(lengths, out=offsets[1:])
+	total = int(offsets[-1])
+
+	owner_lengths = lengths[owners]
+	starts = np.clip(np.asarray(starts, dtype=np.int64), 0, owner_lengths) + offsets[owners]
+	ends = np.clip(np.asarray(ends, dtype=np.int64), 0, owner_lengths) + offsets[owners]
+	valid = ends > starts
+
+	types = np.char.lower(np.asarray(types, dtype=str))
+	coverage = {}
+	for label, prefix in ((EXON, "exon"), (INTRON, "intron")):
+		selected = valid & np.char.startswith(types, prefix)
+		deltas = np.zeros(total + 1, dtype=np.int32)
+		np.add.at(deltas, starts[selected], 1)
+		np.add.at(deltas, ends[selected], -1)
+		coverage[label] = np.cumsum(deltas[:-1]) > 0
+
+	labels = np.full(total, UNKNOWN, dtype=np.uint8)
+	labels[coverage[INTRON]] = INTRON
+	labels[coverage[EXON]] = EXON
+
+	return labels, offsets
+
+
+def split_label_tracks(
+	labels: np.ndarray,
+	offsets: np.ndarray
+) -> list[str]:
+	data = labels.tobytes()
+	return [
+		data[start:end].decode("ascii")
+		for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+	]
+
+
+def build_targets(
+	dna_df: DataFrame,
+	exin_df: DataFrame,
+	key: str = "dna_accession"
+) -> list[str]:
+	positions = {accession: i for i, accession in enumerate(dna_df[key])}
+
+	exin_df = exin_df[exin_df[key].isin(positions)]
+	owners = exin_df[key].map(positions).to_numpy()
+
+	labels, offsets = build_label_tracks(
+		dna_df["sequence"].str.len().to_numpy(),
+		owners,
+		exin_df["start"].to_numpy(),
+		exin_df["end"].to_numpy(),
+		exin_df["type"].astype(str).to_numpy()
+	)
+
+	return split_label_tracks(labels, offsets)
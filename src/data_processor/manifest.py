@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_processor.genbank_index import GenBankIndex
+
+SCHEMA = pa.schema([
+	("accession", pa.string()),
+	("digest", pa.string()),
+	("partition", pa.int32())
+])
+
+
+class ExtractionManifest:
+	def __init__(
+		self,
+		path: str | Path
+	) -> None:
+		self.path = Path(path)
+		self.records: dict[str, tuple[str, int]] = {}
+
+		if self.path.exists():
+			table = pq.read_table(self.path, schema=SCHEMA)
+			for accession, digest, partition in zip(
+				table["accession"].to_pylist(),
+				table["digest"].to_pylist(),
+				table["partition"].to_pylist()
+			):
+				self.records[accession] = (digest, partition)
+
+	def __len__(self) -> int:
+		return len(self.records)
+
+	def diff(
+		self,
+		index: GenBankIndex
+	) -> tuple[list[str], list[str]]:
+		current = dict(zip(index.accessions, index.digests))
+
+		changed = [
+			accession
+			for accession, digest in current.items()
+			if self.records.get(accession, (None,))[0] != digest
+		]
+		removed = [accession for accession in self.records if accession not in current]
+
+		return changed, removed
+
+	def partitions(
+		self,
+		accessions: list[str]
+	) -> set[int]:
+		return {
+			self.records[accession][1]
+			for accession in accessions
+			if accession in self.records
+		}
+
+	def last_partition(self) -> int:
+		return max((partition for _, partition in self.records.values()), default=-1)
+
+	def update(
+		self,
+		accession: str,
+		digest: str,
+		partition: int
+	) -> None:
+		self.records[accession] = (digest, partition)
+
+	def remove(
+		self,
+		accessions: list[str]
+	) -> None:
+		for accession in accessions:
+			self.records.pop(accession, None)
+
+	def save(self) -> None:
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+
+		accessions = list(self.records)
+		table = pa.Table.from_pydict({
+			"accession": accessions,
+			"digest": [self.records[accession][0] for accession in accessions],
+			"partition": [self.records[accession][1] for accession in accessions]
+		}, schema=SCHEMA)
+
+		temporary = self.path.with_suffix(".tmp")
+		pq.write_table(table, temporary, compression="zstd")
+		os.replace(temporary, self.path)
@@ -0,0 +1,195 @@
+import os
+import re
+from pathlib import Path
+from types import TracebackType
+from typing import Literal
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from schemas.tables_data import DNASequence
+
+TableName = Literal["dna", "exin", "cds"]
+
+dictionary_string = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMAS: dict[TableName, pa.Schema] = {
+	"dna": pa.schema([
+		("dna_accession", pa.string()),
+		("organism", dictionary_string),
+		("sequence", pa.large_string())
+	]),
+	"exin": pa.schema([
+		("dna_accession", pa.string()),
+		("sequence", pa.large_string()),
+		("type", dictionary_string),
+		("start", pa.int64()),
+		("end", pa.int64()),
+		("gene", dictionary_string),
+		("strand", pa.int8()),
+		("before", pa.string()),
+		("after", pa.string()),
+		("cds_index", pa.int32())
+	]),
+	"cds": pa.schema([
+		("dna_accession", pa.string()),
+		("sequence", pa.large_string()),
+		("start", pa.int64()),
+		("end", pa.int64()),
+		("gene", dictionary_string)
+	])
+}
+
+PART_NAME = re.compile(r"part-(\d+)\.parquet$")
+
+
+def partition_path(
+	output_dir: str | Path,
+	name: TableName,
+	partition: int
+) -> Path:
+	return Path(output_dir) / name / f"part-{partition:05d}.parquet"
+
+
+def next_partition(output_dir: str | Path) -> int:
+	partitions = [
+		int(match.group(1))
+		for name in SCHEMAS
+		for path in (Path(output_dir) / name).glob("part-*.parquet")
+		if (match := PART_NAME.search(path.name))
+	]
+	return max(partitions, default=-1) + 1
+
+
+def drop_accessions(
+	output_dir: str | Path,
+	partitions: set[int],
+	accessions: set[str]
+) -> None:
+	if not accessions:
+		return
+
+	value_set = pa.array(sorted(accessions), type=pa.string())
+
+	for name, schema in SCHEMAS.items():
+		for partition in sorted(partitions):
+			path = partition_path(output_dir, name, partition)
+			if not path.exists():
+				continue
+
+			table = pq.read_table(path, schema=schema)
+			kept = table.filter(pc.invert(pc.is_in(table["dna_accession"], value_set=value_set)))
+			if kept.num_rows == table.num_rows:
+				continue
+
+			if kept.num_rows == 0:
+				path.unlink()
+				continue
+
+			temporary = path.with_suffix(".tmp")
+			pq.write_table(kept, temporary, compression="zstd")
+			os.replace(temporary, path)
+
+
+class ParquetDatasetWriter:
+	def __init__(
+		self,
+		output_dir: str | Path,
+		chunk_size: int = 2000,
+		records_per_partition: int = 100_000,
+		compression: str = "zstd",
+		start_partition: int = 0
+	) -> None:
+		self.output_dir = Path(output_dir)
+		self.chunk_size = chunk_size
+		self.records_per_partition = records_per_partition
+		self.compression = compression
+
+		self._buffers: dict[TableName, list[dict]] = {name: [] for name in SCHEMAS}
+		self._writers: dict[TableName, pq.ParquetWriter] = {}
+		self._buffered_records = 0
+		self._partition_records = 0
+		self._partition = start_partition
+		self._buffered_accessions: list[str] = []
+		self.accession_partitions: dict[str, int] = {}
+
+		for name in SCHEMAS:
+			(self.output_dir / name).mkdir(parents=True, exist_ok=True)
+
+	def __enter__(self) -> "ParquetDatasetWriter":
+		return self
+
+	def __exit__(
+		self,
+		exc_type: type[BaseException] | None,
+		exc: BaseException | None,
+		traceback: TracebackType | None
+	) -> None:
+		self.close()
+
+	def write(
+		self,
+		dna: DNASequence,
+		write_dna: bool = True
+	) -> None:
+		accession = dna["accession"]
+
+		if write_dna:
+			self._buffers["dna"].append({
+				"dna_accession": accession,
+				"organism": dna["organism"],
+				"sequence": dna["sequence"]
+			})
+
+		for exin in dna["exin"]:
+			self._buffers["exin"].append({"dna_accession": accession, **exin})
+
+		for cds in dna["cds"]:
+			self._buffers["cds"].append({"dna_accession": accession, **cds})
+
+		self._buffered_accessions.append(accession)
+		self._buffered_records += 1
+		if self._buffered_records >= self.chunk_size:
+			self.flush()
+
+	def flush(self) -> None:
+		if self._buffered_records == 0:
+			return
+
+		if self._partition_records >= self.records_per_partition:
+			self._close_writers()
+			self._partition += 1
+			self._partition_records = 0
+
+		for name, rows in self._buffers.items():
+			if not rows:
+				continue
+
+			writer = self._writers.get(name)
+			if writer is None:
+				writer = pq.ParquetWriter(
+					self.output_dir / name / f"part-{self._partition:05d}.parquet",
+					SCHEMAS[name],
+					compression=self.compression
+				)
+				self._writers[name] = writer
+
+			writer.write_table(pa.Table.from_pylist(rows, schema=SCHEMAS[name]))
+			rows.clear()
+
+		for accession in self._buffered_accessions:
+			self.accession_partitions[accession] = self._partition
+		self._buffered_accessions.clear()
+
+		self._partition_records += self._buffered_records
+		self._buffered_records = 0
+
+	def close(self) -> None:
+		self.flush()
+		self._close_writers()
+
+	def _close_writers(self) -> None:
+		for writer in self._writers.values():
+			writer.close()
+		self._writers = {}
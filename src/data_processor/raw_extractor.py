@@ -1,19 +1,31 @@
-from typing import Iterator
+import io
+import mmap
+import os
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                wait)
+from typing import Iterable, Iterator
 
 from Bio import SeqIO
 from Bio.Seq import _PartiallyDefinedSequenceData, _UndefinedSequenceData
 from Bio.SeqFeature import CompoundLocation
+from Bio.SeqRecord import SeqRecord
+
+from data_processor.genbank_index import GenBankIndex
+from data_processor.interval_index import IntervalIndex
+from data_processor.manifest import ExtractionManifest
+from schemas.tables_data import DNASequence
 
 parsed_records = []
 
 def parse_feature_location(loc) -> tuple[int, int]:
 	return int(loc.start), int(loc.end)
 
-def extract_data(
-	annotations_file_path: str,
+def _extract_records(
+	records: Iterable[SeqRecord],
 	flanks_max_length = 25
-) -> Iterator:
-	for record in SeqIO.parse(annotations_file_path, "genbank"):
+) -> Iterator[DNASequence]:
+	for record in records:
 		if (isinstance(record.seq._data, (_UndefinedSequenceData, _PartiallyDefinedSequenceData))):
 			continue
 
@@ -58,6 +70,8 @@ def extract_data(
 					"gene": gene
 				})
 
+		cds_index = IntervalIndex([(cds["start"], cds["end"]) for cds in cds_regions])
+
 		for feature in record.features:
 			if feature.type in ["intron", "exon"]:
 				location = feature.location
@@ -76,6 +90,10 @@ def extract_data(
 				end = location.end
 				if not start or not end:
 					continue
+
+				containing_cds = cds_index.find_containing(int(start), int(end))
+				if containing_cds is None:
+					continue
 				
 				feature_sequence = sequence_dna[start:end]
 				feature_sequence = str(feature_sequence) if strand == 1 else str(feature_sequence.reverse_complement())
@@ -96,10 +114,6 @@ def extract_data(
 				label = str(feature.type)
 				gene = str(gene[0] if type(gene) == list else gene)
 
-				is_inside_cds = any(start >= cds["start"] and end <= cds["end"] for cds in cds_regions)
-				if not is_inside_cds:
-					continue
-
 				exin.append({
 					"sequence": feature_sequence,
 					"type": label.upper(),
@@ -108,7 +122,8 @@ def extract_data(
 					"gene": gene,
 					"strand": strand,
 					"before": before,
-					"after": after
+					"after": after,
+					"cds_index": containing_cds
 				})
 		
 		yield dict({
@@ -117,4 +132,134 @@ def extract_data(
 			"organism": organism,
 			"cds": cds_regions,
 			"exin": exin
-		})
\ No newline at end of file
+		})
+
+def split_records(
+	annotations_file_path: str,
+	num_shards: int
+) -> list[tuple[int, int]]:
+	size = os.path.getsize(annotations_file_path)
+	boundaries = [0]
+
+	with open(annotations_file_path, "rb") as f:
+		for i in range(1, num_shards):
+			offset = max(size * i // num_shards, boundaries[-1])
+			if offset >= size:
+				break
+
+			f.seek(max(offset - 1, 0))
+			f.readline()
+
+			while line := f.readline():
+				if line.rstrip() == b"//":
+					break
+
+			boundaries.append(f.tell())
+
+	boundaries.append(size)
+
+	return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+def _extract_range(
+	annotations_file_path: str,
+	start: int,
+	end: int,
+	flanks_max_length = 25
+) -> list[DNASequence]:
+	with open(annotations_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+		content = data[start:end].decode("utf-8", errors="replace")
+
+	return list(_extract_records(
+		SeqIO.parse(io.StringIO(content), "genbank"),
+		flanks_max_length
+	))
+
+def _extract_parallel(
+	annotations_file_path: str,
+	shards: Iterable[tuple[int, int]],
+	flanks_max_length: int,
+	num_workers: int,
+	ordered: bool
+) -> Iterator[DNASequence]:
+	shards = iter(shards)
+	max_pending = num_workers * 2
+
+	with ProcessPoolExecutor(max_workers=num_workers) as executor:
+		pending: deque[Future] = deque()
+
+		def submit_next() -> bool:
+			shard = next(shards, None)
+			if shard is None:
+				return False
+			pending.append(executor.submit(
+				_extract_range,
+				annotations_file_path,
+				shard[0],
+				shard[1],
+				flanks_max_length
+			))
+			return True
+
+		while len(pending) < max_pending and submit_next():
+			pass
+
+		while pending:
+			if ordered:
+				future = pending.popleft()
+			else:
+				done, _ = wait(pending, return_when=FIRST_COMPLETED)
+				future = done.pop()
+				pending.remove(future)
+
+			submit_next()
+			yield from future.result()
+
+def extract_data(
+	annotations_file_path: str,
+	flanks_max_length = 25,
+	num_workers: int | None = None,
+	ordered: bool = True,
+	shard_size: int = 64 * 1024 * 1024,
+	accessions: Iterable[str] | None = None,
+	shard: tuple[int, int] | None = None,
+	index_path: str | None = None,
+	manifest: ExtractionManifest | None = None
+) -> Iterator[DNASequence]:
+	parallel = num_workers is not None and num_workers > 1
+
+	if accessions is not None or shard is not None or manifest is not None:
+		index = GenBankIndex.load_or_build(annotations_file_path, index_path)
+		if accessions is not None:
+			rows = index.rows(accessions)
+		elif shard is not None:
+			rows = index.shard_rows(shard)
+		else:
+			rows = range(len(index))
+
+		if manifest is not None:
+			changed = set(manifest.diff(index)[0])
+			rows = [row for row in rows if index.accessions[row] in changed]
+
+		shards = index.byte_ranges(rows, max_size=shard_size)
+	elif parallel:
+		size = os.path.getsize(annotations_file_path)
+		shards = split_records(annotations_file_path, max(num_workers, -(-size // shard_size)))
+	else:
+		yield from _extract_records(
+			SeqIO.parse(annotations_file_path, "genbank"),
+			flanks_max_length
+		)
+		return
+
+	if parallel:
+		yield from _extract_parallel(
+			annotations_file_path=annotations_file_path,
+			shards=shards,
+			flanks_max_length=flanks_max_length,
+			num_workers=num_workers,
+			ordered=ordered
+		)
+		return
+
+	for start, end in shards:
+		yield from _extract_range(annotations_file_path, start, end, flanks_max_length)
@@ -0,0 +1,200 @@
+from pathlib import Path
+from types import TracebackType
+from typing import Iterable
+
+import numpy as np
+
+from utils.prompt_encoder import PromptEncoder
+
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+PACK = np.full(256, 255, dtype=np.uint8)
+for code, base in enumerate(b"ACGT"):
+	PACK[base] = code
+
+UNPACK = BASES[(np.arange(256, dtype=np.uint8)[:, None] >> np.array([6, 4, 2, 0], dtype=np.uint8)) & 3]
+
+
+class SequenceStoreWriter:
+	def __init__(
+		self,
+		path: str | Path,
+		append: bool = False
+	) -> None:
+		self.path = Path(path)
+		self.path.mkdir(parents=True, exist_ok=True)
+
+		self._accessions: list[str] = []
+		self._offsets: list[int] = []
+		self._lengths: list[int] = []
+		self._exception_positions: list[np.ndarray] = []
+		self._exception_codes: list[np.ndarray] = []
+		self._offset = 0
+
+		append = append and (self.path / "index.npz").exists()
+		if append:
+			with np.load(self.path / "index.npz") as index:
+				self._accessions = index["accessions"].tolist()
+				self._offsets = index["offsets"].tolist()
+				self._lengths = index["lengths"].tolist()
+			self._exception_positions.append(np.load(self.path / "exception_positions.npy"))
+			self._exception_codes.append(np.load(self.path / "exception_codes.npy"))
+			self._offset = (self.path / "bases.bin").stat().st_size * 4
+
+		self._bases = open(self.path / "bases.bin", "ab" if append else "wb")
+		self._seen: set[str] = set(self._accessions)
+
+	def __enter__(self) -> "SequenceStoreWriter":
+		return self
+
+	def __exit__(
+		self,
+		exc_type: type[BaseException] | None,
+		exc: BaseException | None,
+		traceback: TracebackType | None
+	) -> None:
+		self.close()
+
+	def add(
+		self,
+		accession: str,
+		sequence: str
+	) -> None:
+		if accession in self._seen:
+			raise ValueError(f"Accession '{accession}' was already added to the store.")
+		self._seen.add(accession)
+
+		codes = np.frombuffer(sequence.upper().encode("ascii", errors="replace"), dtype=np.uint8)
+		values = PACK[codes]
+
+		exceptions = np.flatnonzero(values == 255)
+		if len(exceptions):
+			self._exception_positions.append(exceptions + self._offset)
+			self._exception_codes.append(codes[exceptions])
+			values = values.copy()
+			values[exceptions] = 0
+
+		padded = np.zeros(-(-len(values) // 4) * 4, dtype=np.uint8)
+		padded[:len(values)] = values
+		quads = padded.reshape(-1, 4)
+		packed = (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+		self._bases.write(packed.tobytes())
+
+		self._accessions.append(accession)
+		self._offsets.append(self._offset)
+		self._lengths.append(len(values))
+		self._offset += len(padded)
+
+	def remove(
+		self,
+		accessions: Iterable[str]
+	) -> None:
+		# the bases of removed sequences stay in bases.bin, only the index forgets them
+		removed = self._seen.intersection(accessions)
+		if not removed:
+			return None
+
+		kept = [i for i, accession in enumerate(self._accessions) if accession not in removed]
+		self._accessions = [self._accessions[i] for i in kept]
+		self._offsets = [self._offsets[i] for i in kept]
+		self._lengths = [self._lengths[i] for i in kept]
+		self._seen -= removed
+
+	def close(self) -> None:
+		if self._bases.closed:
+			return
+		self._bases.close()
+
+		np.save(self.path / "exception_positions.npy", np.concatenate(
+			self._exception_positions or [np.empty(0, dtype=np.int64)]
+		).astype(np.int64))
+		np.save(self.path / "exception_codes.npy", np.concatenate(
+			self._exception_codes or [np.empty(0, dtype=np.uint8)]
+		).astype(np.uint8))
+		np.savez(
+			self.path / "index.npz",
+			accessions=np.asarray(self._accessions, dtype=str),
+			offsets=np.asarray(self._offsets, dtype=np.int64),
+			lengths=np.asarray(self._lengths, dtype=np.int64)
+		)
+
+
+class SequenceStore:
+	def __init__(
+		self,
+		path: str | Path
+	) -> None:
+		self.path = Path(path)
+
+		size = (self.path / "bases.bin").stat().st_size
+		self._bases = (
+			np.memmap(self.path / "bases.bin", dtype=np.uint8, mode="r")
+			if size else np.empty(0, dtype=np.uint8)
+		)
+		self._exception_positions = np.load(self.path / "exception_positions.npy", mmap_mode="r")
+		self._exception_codes = np.load(self.path / "exception_codes.npy", mmap_mode="r")
+
+		with np.load(self.path / "index.npz") as index:
+			self.accessions: list[str] = index["accessions"].tolist()
+			self._index: dict[str, tuple[int, int]] = {
+				accession: (offset, length)
+				for accession, offset, length in zip(
+					self.accessions,
+					index["offsets"].tolist(),
+					index["lengths"].tolist()
+				)
+			}
+
+	def __len__(self) -> int:
+		return len(self._index)
+
+	def __contains__(
+		self,
+		accession: str
+	) -> bool:
+		return accession in self._index
+
+	def length(
+		self,
+		accession: str
+	) -> int:
+		return self._index[accession][1]
+
+	def codes(
+		self,
+		accession: str,
+		start: int = 0,
+		end: int | None = None
+	) -> np.ndarray:
+		offset, length = self._index[accession]
+		start, end, _ = slice(start, end).indices(length)
+		if end <= start:
+			return np.empty(0, dtype=np.uint8)
+
+		first = offset + start
+		last = offset + end
+		codes = UNPACK[self._bases[first // 4:-(-last // 4)]].ravel()
+		codes = codes[first % 4:first % 4 + end - start]
+
+		low, high = np.searchsorted(self._exception_positions, [first, last])
+		if high > low:
+			codes[self._exception_positions[low:high] - first] = self._exception_codes[low:high]
+
+		return codes
+
+	def fetch(
+		self,
+		accession: str,
+		start: int = 0,
+		end: int | None = None
+	) -> str:
+		return self.codes(accession, start, end).tobytes().decode("ascii")
+
+	def fetch_ids(
+		self,
+		accession: str,
+		encoder: PromptEncoder,
+		start: int = 0,
+		end: int | None = None
+	) -> np.ndarray:
+		return encoder.encode_codes(self.codes(accession, start, end))
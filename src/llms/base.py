@@ -1,19 +1,40 @@
+import copy
+import inspect
 import logging
 import os
 import random
+import sys
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Literal
+from typing import Any, Iterator, Literal
 
 import numpy as np
 import torch
 from colorama import Fore, Style
+from datasets import Dataset
+from datasets import config as datasets_config
+from datasets.fingerprint import Hasher
+from transformers import AutoConfig, AutoTokenizer
+
+from utils.exceptions import MissingEssentialProp
+from utils.onnx_backend import OnnxRuntimeModel, export_onnx
+from utils.quantization import (is_quantized_checkpoint, load_quantized,
+                                quantize_dynamic, save_quantized)
 
 
 class BaseModel(ABC):
 	model = None
 	tokenizer = None
+	tokenizer_class: Any = AutoTokenizer
 	seed = None
+	dataset_cache_dir: str | None = None
+	dataset_num_proc: int | None = None
+	dataset_batch_size = 256
+	dataset_writer_batch_size = 1000
+	onnx_inputs: tuple[str, ...] = ("input_ids", "attention_mask")
+	labels: list[str] = []
+	dataset_seed: int | None = None
+	quantized = False
 
 	def __init__(
 		self,
@@ -101,6 +122,161 @@ class BaseModel(ABC):
 	) -> None:
 		pass
 
+	@abstractmethod
+	def _set_encoder(self) -> None:
+		pass
+
+	@abstractmethod
+	def generate_batch(
+		self,
+		inputs: list[Any],
+		batch_size: int = 8
+	) -> list[Any]:
+		pass
+
+	@abstractmethod
+	def _generate_examples(
+		self,
+		dataset: list[Any]
+	) -> Iterator[dict[str, list[int]]]:
+		pass
+
+	def _quantize(self) -> None:
+		if self.model is None:
+			raise MissingEssentialProp("Model missing.")
+		if self.quantized:
+			return None
+
+		self.model = quantize_dynamic(self.model.to("cpu"))
+		self.quantized = True
+		self._log("Model quantized to dynamic int8.")
+
+	def _load_model(
+		self,
+		model_class: Any,
+		checkpoint: str,
+		**kwargs
+	) -> Any:
+		self.quantized = is_quantized_checkpoint(checkpoint)
+
+		if self.quantized:
+			self._log("Loading quantized int8 weights...")
+			return load_quantized(model_class, checkpoint)
+
+		return model_class.from_pretrained(checkpoint, **kwargs)
+
+	def _dataset_settings(self) -> dict[str, Any]:
+		return {
+			"max_length": getattr(self, "max_length", None)
+		}
+
+	def _preparation_source(self) -> list[str]:
+		sources = []
+		for cls in type(self).__mro__:
+			if not issubclass(cls, BaseModel):
+				continue
+			try:
+				sources.append(inspect.getsource(sys.modules[cls.__module__]))
+			except (KeyError, OSError, TypeError):
+				sources.append(cls.__qualname__)
+
+		return sources
+
+	def _dataset_fingerprint(
+		self,
+		dataset: Dataset
+	) -> str:
+		return Hasher.hash({
+			"model_class": type(self).__name__,
+			"tokenizer": self.tokenizer,
+			"settings": self._dataset_settings(),
+			"source": self._preparation_source(),
+			"seed": self.dataset_seed,
+			"data": dataset._fingerprint
+		})
+
+	def _tokenize_examples(
+		self,
+		batch: dict[str, list],
+		indices: list[int]
+	) -> dict[str, list]:
+		tokenized: dict[str, list] = {
+			"input_ids": [],
+			"attention_mask": [],
+			"labels": [],
+			"length": []
+		}
+		columns = list(batch)
+		random_state = random.getstate()
+
+		for index, values in zip(indices, zip(*batch.values())):
+			random.seed(f"{self.dataset_seed}-{index}")
+
+			for example in self._generate_examples([dict(zip(columns, values))]):
+				for key, value in example.items():
+					tokenized[key].append(value)
+				tokenized["length"].append(len(example["input_ids"]))
+
+		random.setstate(random_state)
+
+		return tokenized
+
+	def _prepare_dataset(
+		self,
+		dataset: list[Any]
+	) -> Dataset:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		raw = Dataset.from_list(dataset)
+		cache: dict[str, Any] = {}
+
+		self.dataset_seed = self.seed
+		if self.dataset_seed is None:
+			# a drawn seed would give every run a new fingerprint, so unseeded
+			# runs are prepared in memory instead of filling the cache
+			self.dataset_seed = random.getrandbits(64)
+			self._log(f"No seed set, preparing dataset in memory with seed {self.dataset_seed}", "DEBUG")
+			cache["keep_in_memory"] = True
+		else:
+			fingerprint = self._dataset_fingerprint(raw)
+			cache_dir = Path(self.dataset_cache_dir or datasets_config.HF_DATASETS_CACHE) / "prepared"
+			cache_dir.mkdir(parents=True, exist_ok=True)
+			cache["cache_file_name"] = str(cache_dir / f"{type(self).__name__}-{fingerprint}.arrow")
+			cache["new_fingerprint"] = fingerprint
+
+		preparer = copy.copy(self)
+		preparer.model = None
+
+		return raw.map(
+			preparer._tokenize_examples,
+			batched=True,
+			batch_size=self.dataset_batch_size,
+			with_indices=True,
+			remove_columns=raw.column_names,
+			num_proc=self.dataset_num_proc,
+			writer_batch_size=self.dataset_writer_batch_size,
+			desc="Preparing dataset",
+			**cache
+		)
+
+	def _pad_batch(
+		self,
+		batch_ids: list[list[int]],
+		padding_side: Literal["left", "right"] = "right"
+	) -> tuple[torch.Tensor, torch.Tensor]:
+		if self.model is None or self.tokenizer is None:
+			raise MissingEssentialProp("Model or Tokenizer missing.")
+
+		padded = self.tokenizer.pad(
+			{"input_ids": batch_ids},
+			padding=True,
+			padding_side=padding_side,
+			return_tensors="pt"
+		).to(self.model.device)
+
+		return (padded["input_ids"], padded["attention_mask"])
+
 	def save_pretrained(
 		self,
 		output_path: str | Path
@@ -110,15 +286,61 @@ class BaseModel(ABC):
 			self._log("Model or Tokenizer not found. Aborting...")
 			return None
 
-		self.model.save_pretrained(output_path)
+		if self.quantized:
+			save_quantized(self.model, output_path)
+		else:
+			self.model.save_pretrained(output_path)
 		self.tokenizer.save_pretrained(output_path)
 		self._log(f"Successfully saved at '{output_path}'")
 
+	def export_onnx(
+		self,
+		output_path: str | Path,
+		opset_version: int = 17
+	) -> None:
+		if self.model is None or self.tokenizer is None:
+			raise MissingEssentialProp("Model or Tokenizer missing.")
+		if isinstance(self.model, OnnxRuntimeModel):
+			raise ValueError("Model is already an ONNX runtime session.")
+		if self.quantized:
+			raise ValueError("Quantized models cannot be exported to ONNX.")
+		if not self.onnx_inputs:
+			raise ValueError(f"{type(self).__name__} does not support ONNX export.")
+
+		if self.labels:
+			# load_onnx reads only config.json, so it carries the label names
+			self.model.config.id2label = dict(enumerate(self.labels))
+			self.model.config.label2id = {label: index for index, label in enumerate(self.labels)}
+
+		self.save_pretrained(output_path)
+
+		self._log("Exporting ONNX graph...")
+		path = export_onnx(self.model, output_path, self.onnx_inputs, opset_version)
+		self._log(f"ONNX graph saved at '{path}'")
+
+	def load_onnx(
+		self,
+		path: str | Path,
+		num_threads: int | None = None
+	) -> None:
+		if not self.onnx_inputs:
+			raise ValueError(f"{type(self).__name__} does not support ONNX export.")
+
+		config = AutoConfig.from_pretrained(str(path))
+
+		if self.model is not None:
+			self.unload_model()
+		self.tokenizer = self.tokenizer_class.from_pretrained(str(path))
+		self._set_encoder()
+		self.model = OnnxRuntimeModel(path, config, num_threads=num_threads)
+		self._log("ONNX runtime backend loaded.")
+
 	def unload_model(self) -> None:
 		try:
 			self._log("Trying to reset model...")
 			del self.model
 			self.model = None
+			self.quantized = False
 		except Exception as e:
 			self._log("Couldn't reset model...", "ERROR")
 			self._log(str(e), "DEBUG")
@@ -1,19 +1,18 @@
-import re
-from typing import Literal, TypedDict, cast
+from typing import Iterator, Literal, TypedDict
 
+import numpy as np
 import torch
-from datasets import Dataset
-from tqdm import tqdm
 from transformers.models.gpt2 import GPT2LMHeadModel, GPT2Tokenizer
-from transformers.trainer import Trainer
 from transformers.training_args import TrainingArguments
 
 from llms.base import BaseModel
 from schemas.train_params import TrainParams
+from utils.batching import length_sorted_batches
 from utils.data_collators import DataCollatorForFT
 from utils.exceptions import MissingEssentialProp
+from utils.prompt_encoder import IUPAC_NUCLEOTIDES, PromptEncoder
+from utils.trainer import LengthGroupedTrainer
 
-valid_dna = set("ACGTURYSWKMBDHVN")
 valid_prot = set("ACDEFGHIKLMNPQRSTVWY*X")
 
 class Input(TypedDict):
@@ -28,7 +27,12 @@ class GenerateInput(TypedDict):
 class DnaTranslatorGPT(BaseModel):
 	model: GPT2LMHeadModel | None = None
 	tokenizer: GPT2Tokenizer | None = None
+	encoder: PromptEncoder | None = None
+	protein_encoder: PromptEncoder | None = None
+	protein_symbols: dict[int, str] = {}
 	max_length = 1024
+	generation_margin = 16
+	onnx_inputs = ()
 	pad_token = "[PROT_*]"
 	eos_token = "[PROT_*]"
 
@@ -74,6 +78,7 @@ class DnaTranslatorGPT(BaseModel):
 			return None
 		
 		self.model.resize_token_embeddings(len(self.tokenizer), mean_resizing=False)
+		self._set_encoder()
 
 	def from_pretrained(
 		self,
@@ -81,27 +86,58 @@ class DnaTranslatorGPT(BaseModel):
 	) -> None:
 		self.model = GPT2LMHeadModel.from_pretrained(checkpoint)
 		self.tokenizer = GPT2Tokenizer.from_pretrained(checkpoint)
+		self._set_encoder()
+
+	def _set_encoder(self) -> None:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		self.encoder = PromptEncoder(
+			self.tokenizer,
+			{nucl: f"[DNA_{nucl}]" for nucl in IUPAC_NUCLEOTIDES}
+		)
+		self.protein_encoder = PromptEncoder(
+			self.tokenizer,
+			{prot: f"[PROT_{prot}]" for prot in valid_prot}
+		)
+
+		vocab = self.tokenizer.get_vocab()
+		self.protein_symbols = {vocab[f"[PROT_{prot}]"]: prot for prot in valid_prot}
 
 	def _process_sequence(
 		self,
 		sequence: str
-	) -> str:
-		return "".join(f"[DNA_{nucl.upper()}]" for nucl in sequence if nucl.upper() in valid_dna)
+	) -> np.ndarray:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		return self.encoder.encode_sequence(sequence)
 
 	def _process_target(
 		self,
 		target: str
-	) -> str:
+	) -> np.ndarray:
+		if self.protein_encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
 		target = target + "*"
 		target = target[:target.find("*") + 1]
-		return "".join(f"[PROT_{prot.upper()}]" for prot in target if prot.upper() in valid_prot)
+		return self.protein_encoder.encode_sequence(target)
 	
 	def _unprocess_target(
 		self,
-		protein_tokens: str
+		generated_ids: list[int],
+		eos_token_id: int
 	) -> str:
-		matches = re.findall(r"\[PROT_([A-Z*])\]", protein_tokens.upper())
-		return "".join(matches)
+		protein = []
+		for token_id in generated_ids:
+			if token_id == eos_token_id:
+				break
+			symbol = self.protein_symbols.get(token_id)
+			if symbol is not None:
+				protein.append(symbol)
+
+		return "".join(protein)
 	
 	def build_input(
 		self,
@@ -119,94 +155,78 @@ class DnaTranslatorGPT(BaseModel):
 		self,
 		sequence: str,
 		target: str | None = None,
-		organism: str | None = None
-	) -> dict[Literal["partial", "complete"], str]:
-			output = f"<|DNA|>{self._process_sequence(sequence)}"
-
-			if organism:
-				output += f"<|ORGANISM|>{organism[:10]}"
+		organism: str | None = None,
+		max_length: int | None = None
+	) -> dict[Literal["partial", "complete"], list[int]]:
+			if self.encoder is None:
+				raise MissingEssentialProp("Encoder missing.")
 
-			output += f"<|PROTEIN|>"
+			prefix = self.encoder.encode_text("<|DNA|>")
+			sequence_ids = self._process_sequence(sequence)
 
-			return {
-				"partial": output,
-				"complete": output+(self._process_target(target)+self.eos_token if target else "")
-			}	
+			suffix = []
+			if organism:
+				suffix.append(self.encoder.encode_text(f"<|ORGANISM|>{organism[:10]}"))
+			suffix.append(self.encoder.encode_text("<|PROTEIN|>"))
 
-	def _tokenize(
-		self,
-		input_text: str
-	) -> tuple[torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
+			# only the dna body is cut, the prompt has to end in <|PROTEIN|>
+			if max_length is not None:
+				budget = (
+					max_length
+					- self.encoder.tokenizer.num_special_tokens_to_add()
+					- len(prefix)
+					- sum(len(ids) for ids in suffix)
+				)
+				sequence_ids = sequence_ids[:max(budget, 0)]
 
-		tokenized = self.tokenizer(
-			input_text,
-			truncation=True,
-			max_length=self.max_length,
-			return_tensors="pt"
-		).to(self.model.device)
+			output = [prefix, sequence_ids, *suffix]
 
-		input_ids = tokenized["input_ids"]
-		input_ids = cast(torch.Tensor, input_ids)
-		attention_mask = tokenized["attention_mask"]
-		attention_mask = cast(torch.Tensor, attention_mask)
+			completion = []
+			if target:
+				completion = [self._process_target(target), self.encoder.encode_text(self.eos_token)]
 
-		return (input_ids, attention_mask)
+			return {
+				"partial": self.encoder.encode(output),
+				"complete": self.encoder.encode(output + completion)
+			}
 
 	def _tokenize_for_training(
 		self,
-		input_text: str,
-		expected_text: str
-	) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
-		
-		encoded_input = self.tokenizer(
-			input_text
-		)
-		encoded_expected = self.tokenizer(
-			expected_text
-		)
-
-		input_ids = torch.tensor(encoded_expected["input_ids"], dtype=torch.long)
-		attention_mask = torch.tensor(encoded_expected["attention_mask"], dtype=torch.bool)
+		input_ids: list[int],
+		expected_ids: list[int]
+	) -> tuple[list[int], list[int], list[int]]:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
 
-		labels = torch.full_like(input_ids, -100)
+		start = len(input_ids)
 
-		start = len(cast(list, encoded_input["input_ids"]))
-
-		for i in range(start, len(input_ids)):
-			if input_ids[i] != self.tokenizer.pad_token_id:
-				labels[i] = input_ids[i]
+		# eos shares its id with pad, so it must not be masked here or the
+		# model never learns to stop; DataCollatorForFT masks the padding
+		labels = [-100] * start + list(expected_ids[start:])
 		
-		return input_ids, attention_mask, labels
+		return expected_ids, [1] * len(expected_ids), labels
 
-	def _prepare_dataset(
+	def _generate_examples(
 		self,
 		dataset: list[Input]
-	) -> Dataset:
-		tokenized = []
-
-		for data in tqdm(dataset):
+	) -> Iterator[dict[str, list[int]]]:
+		for data in dataset:
 			promptfied = self._build_input(
 				sequence=data["sequence"],
 				target=data.get("target"),
 				organism=data.get("organism", "")
 			)
 			tokenized_input = self._tokenize_for_training(
-				input_text=promptfied["partial"],
-				expected_text=promptfied["complete"]
+				input_ids=promptfied["partial"],
+				expected_ids=promptfied["complete"]
 			)
 
 			input_ids, attention_mask, labels = tokenized_input
-			tokenized.append({
+			yield {
 				"input_ids": input_ids,
 				"attention_mask": attention_mask,
 				"labels": labels
-			})
-
-		return Dataset.from_list(tokenized)
+			}
 
 	def train(
 		self,
@@ -233,11 +253,13 @@ class DnaTranslatorGPT(BaseModel):
 		if self.seed:
 			args.seed = self.seed
 
-		trainer = Trainer(
+		trainer = LengthGroupedTrainer(
 			model=self.model,
 			train_dataset=data,
 			args=args,
 			data_collator=DataCollatorForFT(self.tokenizer),
+			max_tokens=params.max_tokens,
+			group_by_length=params.group_by_length
 		)
 
 		self._log("Starting training...")
@@ -250,33 +272,59 @@ class DnaTranslatorGPT(BaseModel):
 		self,
 		input: GenerateInput
 	) -> str:
+		return self.generate_batch([input], batch_size=1)[0]
+
+	def generate_batch(
+		self,
+		inputs: list[GenerateInput],
+		batch_size: int = 8
+	) -> list[str]:
 		if self.model is None or self.tokenizer is None:
 			raise MissingEssentialProp("Model or Tokenizer missing.")
 		
-		model_input = self._build_input(
-			sequence=input["sequence"],
-			organism=input.get("organism")
-		)
+		eos_token_id = self.tokenizer.convert_tokens_to_ids(self.eos_token)
+
+		config = self.model.config
+		context_size = getattr(config, "n_positions", None) or getattr(config, "max_position_embeddings", None)
+		max_total_length = min(self.max_length, context_size) if context_size else self.max_length
+
+		prompts = []
+		for input in inputs:
+			model_input = self._build_input(
+				sequence=input["sequence"],
+				organism=input.get("organism"),
+				max_length=max_total_length - 1
+			)
+			prompts.append(model_input["partial"])
 
-		input_ids, attention_mask = self._tokenize(model_input["partial"])
+		results = [""] * len(prompts)
 
 		self.model.eval()
 		with torch.no_grad():
-			generated = self.model.generate(
-				input_ids=input_ids,
-				attention_mask=attention_mask,
-				max_new_tokens=128,
-				pad_token_id=self.tokenizer.pad_token_id,
-				do_sample=True,
-				temperature=0.8,
-				top_p=0.95,
-				typical_p=0.98,
-				num_beams=1
-			)
-		
-		generated_texts = self.tokenizer.decode(generated[0], skip_special_tokens=False)
-
-		start = generated_texts.find("<|PROTEIN|>")
-		protein_tokenized = generated_texts[start + len("<|PROTEINS|>"):].strip()
+			for batch in length_sorted_batches([len(p) for p in prompts], batch_size):
+				input_ids, attention_mask = self._pad_batch(
+					[prompts[i] for i in batch],
+					padding_side="left"
+				)
+
+				prompt_length = input_ids.shape[1]
+				max_new_tokens = max(len(inputs[i]["sequence"]) for i in batch) // 3 + self.generation_margin
+
+				generated = self.model.generate(
+					input_ids=input_ids,
+					attention_mask=attention_mask,
+					max_new_tokens=max(1, min(max_new_tokens, max_total_length - prompt_length)),
+					eos_token_id=eos_token_id,
+					pad_token_id=self.tokenizer.pad_token_id,
+					use_cache=True,
+					do_sample=True,
+					temperature=0.8,
+					top_p=0.95,
+					typical_p=0.98,
+					num_beams=1
+				)
+
+				for i, row in zip(batch, generated[:, prompt_length:].tolist()):
+					results[i] = self._unprocess_target(row, eos_token_id)
 		
-		return self._unprocess_target(protein_tokenized)
\ No newline at end of file
+		return results
\ No newline at end of file
@@ -1,17 +1,19 @@
 import random
-from typing import Literal, TypedDict, cast
+from typing import Iterator, Literal, TypedDict
 
+import numpy as np
 import torch
-from datasets import Dataset
-from tqdm import tqdm
 from transformers import (BertForSequenceClassification, BertTokenizer,
                           DataCollatorWithPadding)
-from transformers.trainer import Trainer
 from transformers.training_args import TrainingArguments
 
 from llms.base import BaseModel
+from llms.exin_classifier.chunked import ChunkedClassifier
 from schemas.train_params import TrainParams
+from utils.batching import length_sorted_batches
 from utils.exceptions import MissingEssentialProp
+from utils.prompt_encoder import IUPAC_NUCLEOTIDES, PromptEncoder
+from utils.trainer import LengthGroupedTrainer
 
 
 class Input(TypedDict):
@@ -23,14 +25,18 @@ class Input(TypedDict):
 	after: str | None
 	hide_prob: float | None
 
-class ExInClassifierBERT(BaseModel):
+class ExInClassifierBERT(ChunkedClassifier, BaseModel):
 	model: BertForSequenceClassification | None = None
 	tokenizer: BertTokenizer | None = None
+	tokenizer_class = BertTokenizer
+	encoder: PromptEncoder | None = None
 	max_length = 512
+	labels = ["EXON", "INTRON"]
 
 	def load_checkpoint(
 		self,
-		checkpoint: str
+		checkpoint: str,
+		quantize: bool = False
 	) -> None:
 		self.model = BertForSequenceClassification.from_pretrained(
 			checkpoint,
@@ -69,24 +75,43 @@ class ExInClassifierBERT(BaseModel):
 			return None
 		
 		self.model.resize_token_embeddings(len(self.tokenizer), mean_resizing=False)
+		self._set_encoder()
+
+		if quantize:
+			self._quantize()
 	
 	def from_pretrained(
 		self,
-		checkpoint: str
+		checkpoint: str,
+		quantize: bool = False
 	) -> None:
-		self.model = BertForSequenceClassification.from_pretrained(
-			checkpoint
-		)
+		self.model = self._load_model(BertForSequenceClassification, checkpoint)
 		self.tokenizer = BertTokenizer.from_pretrained(
 			checkpoint,
 			num_labels=2
 		)
+		self._set_encoder()
+
+		if quantize:
+			self._quantize()
+
+	def _set_encoder(self) -> None:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		self.encoder = PromptEncoder(
+			self.tokenizer,
+			{nucl: f"[{nucl}]" for nucl in IUPAC_NUCLEOTIDES}
+		)
 
 	def _process_sequence(
 		self,
 		sequence: str
-	) -> str:
-		return f"".join(f"[{nucl.upper()}]" for nucl in sequence)
+	) -> np.ndarray:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		return self.encoder.encode_sequence(sequence)
 	
 	def _process_target(
 		self,
@@ -130,99 +155,72 @@ class ExInClassifierBERT(BaseModel):
 		self,
 		data: Input,
 		hide_prob: float = 0.01
-	) -> tuple[str, int | None]:
-		output = f"<|SEQUENCE|>{self._process_sequence(data["sequence"])}"
+	) -> tuple[list[int], int | None]:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		output = [
+			self.encoder.encode_text("<|SEQUENCE|>"),
+			self._process_sequence(data["sequence"])
+		]
 
 		if data["organism"]:
 			if random.random() > hide_prob:
-				output += f"<|ORGANISM|>{data["organism"][:10].lower()}"
+				output.append(self.encoder.encode_text(f"<|ORGANISM|>{data["organism"][:10].lower()}"))
 
 		if data["gene"]:
 			if random.random() > hide_prob:
-				output += f"<|GENE|>{data["gene"][:10].lower()}"
+				output.append(self.encoder.encode_text(f"<|GENE|>{data["gene"][:10].lower()}"))
 		
 		if data["before"]:
-			before = self._process_sequence(data["before"])
 			if random.random() > hide_prob:
-				output += f"<|FLANK_BEFORE|>{before}"
+				output.append(self.encoder.encode_text("<|FLANK_BEFORE|>"))
+				output.append(self._process_sequence(data["before"]))
 		
 		if data["after"]:
-			after = self._process_sequence(data["after"])
 			if random.random() > hide_prob:
-				output += f"<|FLANK_AFTER|>{after}"
+				output.append(self.encoder.encode_text("<|FLANK_AFTER|>"))
+				output.append(self._process_sequence(data["after"]))
 		
-		output += "<|TARGET|>"
+		output.append(self.encoder.encode_text("<|TARGET|>"))
 
 		label = None
 		if data["target"]:
 			label = self._process_target(data["target"])
 
-		return output, label 
-	
-	def _tokenize(
-		self,
-		input_text: str
-	) -> tuple[torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
-
-		tokenized = self.tokenizer(
-			input_text,
-			truncation=True,
-			max_length=self.max_length,
-			return_tensors="pt"
-		).to(self.model.device)
-
-		input_ids = tokenized["input_ids"]
-		input_ids = cast(torch.Tensor, input_ids)
-		attention_mask = tokenized["attention_mask"]
-		attention_mask = cast(torch.Tensor, attention_mask)
-
-		return (input_ids, attention_mask)
+		return self.encoder.encode(output, max_length=self.max_length), label 
 	
 	def _tokenize_for_training(
 		self,
-		sentence: str,
+		input_ids: list[int],
 		target: int
-	) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
-		
-		encoded_input = self.tokenizer(
-			sentence
-		)
+	) -> tuple[list[int], list[int], list[int]]:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
 
-		input_ids = torch.tensor(encoded_input["input_ids"], dtype=torch.long)
-		attention_mask = torch.tensor(encoded_input["attention_mask"], dtype=torch.bool)
-		label = torch.tensor([target], dtype=torch.long)
+		return input_ids, [1] * len(input_ids), [target]
 
-		return input_ids, attention_mask, label
-
-	def _prepare_dataset(
+	def _generate_examples(
 		self,
 		dataset: list[Input]
-	) -> Dataset:
-		tokenized = []
-
-		for data in tqdm(dataset):
-			sentence, target = self._build_input(data)
+	) -> Iterator[dict[str, list[int]]]:
+		for data in dataset:
+			input_ids, target = self._build_input(data)
 
 			if target is None:
 				raise ValueError("Target is missing.")
 
 			tokenized_input = self._tokenize_for_training(
-				sentence=sentence,
+				input_ids=input_ids,
 				target=target
 			)
 
 			input_ids, attention_mask, labels = tokenized_input
-			tokenized.append({
+			yield {
 				"input_ids": input_ids,
 				"attention_mask": attention_mask,
 				"labels": labels
-			})
-
-		return Dataset.from_list(tokenized)
+			}
 
 	def train(
 		self,
@@ -249,11 +247,13 @@ class ExInClassifierBERT(BaseModel):
 		if self.seed:
 			args.seed = self.seed
 
-		trainer = Trainer(
+		trainer = LengthGroupedTrainer(
 			model=self.model,
 			train_dataset=data,
 			args=args,
-			data_collator=DataCollatorWithPadding(self.tokenizer)
+			data_collator=DataCollatorWithPadding(self.tokenizer),
+			max_tokens=params.max_tokens,
+			group_by_length=params.group_by_length
 		)
 
 		self._log("Starting training...")
@@ -266,18 +266,46 @@ class ExInClassifierBERT(BaseModel):
 		self,
 		data: Input
 	) -> str:
+		return self.generate_batch([data], batch_size=1)[0]
+
+	def generate_batch(
+		self,
+		inputs: list[Input],
+		batch_size: int = 8
+	) -> list[str]:
+		logits = self._class_logits(inputs, batch_size)
+
+		return [self._unprocess_target(int(pred_id)) for pred_id in logits.argmax(dim=-1).tolist()]
+
+	def _class_logits(
+		self,
+		inputs: list[Input],
+		batch_size: int = 8
+	) -> torch.Tensor:
 		if self.model is None or self.tokenizer is None:
 			raise MissingEssentialProp("Model or Tokenizer missing.")
 		
-		sentence, _ = self._build_input(data)
+		prompts = [self._build_input(data)[0] for data in inputs]
 
-		input_ids, _ = self._tokenize(sentence)
+		logits = torch.zeros((len(prompts), len(self.labels)))
 
 		self.model.eval()
 		with torch.no_grad():
-			outputs = self.model(
-				input_ids=input_ids
-			)
-			pred_id = torch.argmax(outputs.logits, dim=-1).item()
+			for batch in length_sorted_batches([len(p) for p in prompts], batch_size):
+				input_ids, attention_mask = self._pad_batch([prompts[i] for i in batch])
+
+				outputs = self.model(
+					input_ids=input_ids,
+					attention_mask=attention_mask
+				)
+				logits[batch] = outputs.logits.float().cpu()
 		
-		return self._unprocess_target(int(pred_id))
\ No newline at end of file
+		return logits
+
+	def _window_length(
+		self,
+		input: Input
+	) -> int:
+		overhead, _ = self._build_input({**input, "sequence": "", "target": None}, hide_prob=0)
+
+		return max(1, self.max_length - len(overhead))
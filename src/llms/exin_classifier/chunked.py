@@ -0,0 +1,109 @@
+from abc import ABC, abstractmethod
+from typing import Any, TypedDict
+
+import torch
+
+from utils.chunking import Pooling, pool_logits, window_spans
+
+
+class WindowScore(TypedDict):
+	start: int
+	end: int
+	probabilities: dict[str, float]
+
+class ChunkedPrediction(TypedDict):
+	label: str
+	probabilities: dict[str, float]
+	windows: list[WindowScore]
+
+class ChunkedClassifier(ABC):
+	labels: list[str]
+	chunk_overlap = 64
+
+	@abstractmethod
+	def _class_logits(
+		self,
+		inputs: list[Any],
+		batch_size: int = 8
+	) -> torch.Tensor:
+		pass
+
+	@abstractmethod
+	def _window_length(
+		self,
+		input: Any
+	) -> int:
+		pass
+
+	def _window_input(
+		self,
+		input: Any,
+		start: int,
+		end: int
+	) -> Any:
+		sequence = input["sequence"]
+		window = {**input, "sequence": sequence[start:end]}
+
+		before = input.get("before")
+		if before:
+			window["before"] = (before + sequence[:start])[-len(before):]
+
+		after = input.get("after")
+		if after:
+			window["after"] = (sequence[end:] + after)[:len(after)]
+
+		return window
+
+	def score_chunked(
+		self,
+		inputs: list[Any],
+		batch_size: int = 8,
+		window: int | None = None,
+		overlap: int | None = None,
+		pooling: Pooling = "mean"
+	) -> list[ChunkedPrediction]:
+		overlap = self.chunk_overlap if overlap is None else overlap
+
+		window_inputs = []
+		spans: list[list[tuple[int, int]]] = []
+		for input in inputs:
+			size = window or self._window_length(input)
+			input_spans = window_spans(len(input["sequence"]), size, min(overlap, size - 1))
+			spans.append(input_spans)
+			window_inputs.extend(self._window_input(input, start, end) for start, end in input_spans)
+
+		logits = self._class_logits(window_inputs, batch_size)
+
+		predictions: list[ChunkedPrediction] = []
+		offset = 0
+		for input_spans in spans:
+			window_logits = logits[offset:offset + len(input_spans)]
+			offset += len(input_spans)
+
+			probabilities = torch.softmax(pool_logits(window_logits, pooling), dim=-1).tolist()
+			window_probabilities = torch.softmax(window_logits, dim=-1).tolist()
+
+			predictions.append({
+				"label": self.labels[max(range(len(self.labels)), key=lambda i: probabilities[i])],
+				"probabilities": dict(zip(self.labels, probabilities)),
+				"windows": [{
+					"start": start,
+					"end": end,
+					"probabilities": dict(zip(self.labels, row))
+				} for (start, end), row in zip(input_spans, window_probabilities)]
+			})
+
+		return predictions
+
+	def generate_chunked(
+		self,
+		inputs: list[Any],
+		batch_size: int = 8,
+		window: int | None = None,
+		overlap: int | None = None,
+		pooling: Pooling = "mean"
+	) -> list[str]:
+		return [
+			prediction["label"]
+			for prediction in self.score_chunked(inputs, batch_size, window, overlap, pooling)
+		]
@@ -1,16 +1,17 @@
-from typing import Literal, TypedDict
+from typing import Any, Iterator, Literal, TypedDict
 
 import torch
-from datasets import Dataset
-from tqdm import tqdm
 from transformers import (AutoModelForSequenceClassification, AutoTokenizer,
                           DataCollatorWithPadding)
-from transformers.trainer import Trainer
 from transformers.training_args import TrainingArguments
 
 from llms.base import BaseModel
+from llms.exin_classifier.chunked import ChunkedClassifier
 from schemas.train_params import TrainParams
+from utils.batching import length_sorted_batches
 from utils.exceptions import MissingEssentialProp
+from utils.kmer_encoder import KmerEncoder
+from utils.trainer import LengthGroupedTrainer
 
 
 class Input(TypedDict):
@@ -20,38 +21,60 @@ class Input(TypedDict):
 class GenerateInput(TypedDict):
 	sequence: str
 
-class ExInClassifierDNABERT(BaseModel):
+class ExInClassifierDNABERT(ChunkedClassifier, BaseModel):
 	model = None
 	tokenizer = None
+	encoder: KmerEncoder | None = None
 	max_length = 512
+	kmer_size = 6
+	kmer_stride = 6
+	labels = ["INTRON", "EXON"]
 
 	def load_checkpoint(
 		self,
-		checkpoint: str
+		checkpoint: str,
+		quantize: bool = False
 	) -> None:
 		self.model = AutoModelForSequenceClassification.from_pretrained(checkpoint, num_labels=2)
 		self.tokenizer = AutoTokenizer.from_pretrained(checkpoint)
+		self._set_encoder()
+
+		if quantize:
+			self._quantize()
 
 	def from_pretrained(
 		self,
-		checkpoint: str
+		checkpoint: str,
+		quantize: bool = False
 	) -> None:
-		self.model = AutoModelForSequenceClassification.from_pretrained(checkpoint, num_labels=2)
+		self.model = self._load_model(AutoModelForSequenceClassification, checkpoint, num_labels=2)
 		self.tokenizer = AutoTokenizer.from_pretrained(checkpoint)
-		
+		self._set_encoder()
+
+		if quantize:
+			self._quantize()
+
+	def _set_encoder(self) -> None:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		self.encoder = KmerEncoder(self.tokenizer, k=self.kmer_size, stride=self.kmer_stride)
+
+	def _dataset_settings(self) -> dict[str, Any]:
+		return {
+			**super()._dataset_settings(),
+			"kmer_size": self.kmer_size,
+			"kmer_stride": self.kmer_stride
+		}
+
 	def _process_sequence(
 		self,
 		sequence: str
-	) -> str:
-		k = 6
-
-		remain = len(sequence) % k
-		if remain != 0:
-			padding_len = k - remain
-			sequence += 'N' * padding_len
+	) -> list[int]:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
 
-		k_mers = [sequence[i:i+k] for i in range(0, len(sequence), k)]
-		return " ".join(k_mers)
+		return self.encoder.encode(sequence, max_length=self.max_length)
 	
 	def _process_target(
 		self,
@@ -81,7 +104,7 @@ class ExInClassifierDNABERT(BaseModel):
 		self,
 		sequence: str,
 		target: str | None = None
-	) -> tuple[str, int | None]:
+	) -> tuple[list[int], int | None]:
 		output = self._process_sequence(sequence)
 
 		label = None
@@ -90,51 +113,19 @@ class ExInClassifierDNABERT(BaseModel):
 		
 		return output, label
 	
-	def _tokenize(
-		self,
-		input_text: str
-	) -> tuple[torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
-		
-		tokenized = self.tokenizer(
-			input_text,
-			truncation=True,
-			max_length=self.max_length,
-			return_tensors="pt"
-		).to(self.model.device)
-
-		input_ids = tokenized["input_ids"]
-		attention_mask = tokenized["attention_mask"]
-
-		return (input_ids, attention_mask)
-	
 	def _tokenize_for_training(
 		self,
-		sentence: str,
+		input_ids: list[int],
 		target: int
-	) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
-		
-		encoded_input = self.tokenizer(
-			sentence
-		)
-
-		input_ids = torch.tensor(encoded_input["input_ids"], dtype=torch.long)
-		attention_mask = torch.tensor(encoded_input["attention_mask"], dtype=torch.bool)
-		label = torch.tensor([target], dtype=torch.long)
-
-		return input_ids, attention_mask, label
+	) -> tuple[list[int], list[int], list[int]]:
+		return input_ids, [1] * len(input_ids), [target]
 	
-	def _prepare_dataset(
+	def _generate_examples(
 		self,
 		dataset: list[Input]
-	) -> Dataset:
-		tokenized = []
-
-		for data in tqdm(dataset):
-			sentence, target = self._build_input(
+	) -> Iterator[dict[str, list[int]]]:
+		for data in dataset:
+			input_ids, target = self._build_input(
 				sequence=data["sequence"],
 				target=data.get("target")
 			)
@@ -143,18 +134,17 @@ class ExInClassifierDNABERT(BaseModel):
 				raise ValueError("Target is missing.")
 			
 			tokenized_input = self._tokenize_for_training(
-				sentence=sentence,
+				input_ids=input_ids,
 				target=target
 			)
 
 			input_ids, attention_mask, labels = tokenized_input
-			tokenized.append({
+			yield {
 				"input_ids": input_ids,
 				"attention_mask": attention_mask,
 				"labels": labels
-			})
+			}
 
-		return Dataset.from_list(tokenized)
 		
 	def train(
 		self,
@@ -181,11 +171,13 @@ class ExInClassifierDNABERT(BaseModel):
 		if self.seed:
 			args.seed = self.seed
 
-		trainer = Trainer(
+		trainer = LengthGroupedTrainer(
 			model=self.model,
 			train_dataset=data,
 			args=args,
 			data_collator=DataCollatorWithPadding(self.tokenizer),
+			max_tokens=params.max_tokens,
+			group_by_length=params.group_by_length
 		)
 
 		self._log("Starting training...")
@@ -198,20 +190,53 @@ class ExInClassifierDNABERT(BaseModel):
 		self,
 		input: GenerateInput
 	) -> str:
+		return self.generate_batch([input], batch_size=1)[0]
+
+	def generate_batch(
+		self,
+		inputs: list[GenerateInput],
+		batch_size: int = 8
+	) -> list[str]:
+		logits = self._class_logits(inputs, batch_size)
+
+		return [self._unprocess_target(int(pred_id)) for pred_id in logits.argmax(dim=-1).tolist()]
+
+	def _class_logits(
+		self,
+		inputs: list[GenerateInput],
+		batch_size: int = 8
+	) -> torch.Tensor:
 		if self.model is None or self.tokenizer is None:
 			raise MissingEssentialProp("Model or Tokenizer missing.")
 		
-		sentence, _ = self._build_input(
-			sequence=input["sequence"]
-		)
+		prompts = [
+			self._build_input(sequence=input["sequence"])[0]
+			for input in inputs
+		]
 
-		input_ids, _ = self._tokenize(sentence)
+		logits = torch.zeros((len(prompts), len(self.labels)))
 
 		self.model.eval()
 		with torch.no_grad():
-			outputs = self.model(
-				input_ids=input_ids
-			)
-			pred_id = torch.argmax(outputs.logits, dim=-1).item()
+			for batch in length_sorted_batches([len(p) for p in prompts], batch_size):
+				input_ids, attention_mask = self._pad_batch([prompts[i] for i in batch])
+
+				outputs = self.model(
+					input_ids=input_ids,
+					attention_mask=attention_mask
+				)
+				logits[batch] = outputs.logits.float().cpu()
 		
-		return self._unprocess_target(int(pred_id))
\ No newline at end of file
+		return logits
+
+	def _window_length(
+		self,
+		input: GenerateInput
+	) -> int:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		tokens = max(1, self.max_length - self.tokenizer.num_special_tokens_to_add())
+		if self.kmer_stride == 1:
+			return tokens + self.kmer_size - 1
+		return tokens * self.kmer_size
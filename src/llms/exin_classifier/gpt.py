@@ -1,16 +1,18 @@
 import random
-from typing import Literal, TypedDict, cast
+from typing import Iterator, Literal, TypedDict
 
+import numpy as np
 import torch
-from datasets import Dataset
 from llms.base import BaseModel
+from llms.exin_classifier.chunked import ChunkedClassifier
 from schemas.train_params import TrainParams
-from tqdm import tqdm
 from transformers.models.gpt2 import GPT2LMHeadModel, GPT2Tokenizer
-from transformers.trainer import Trainer
 from transformers.training_args import TrainingArguments
+from utils.batching import length_sorted_batches
 from utils.data_collators import DataCollatorForFT
 from utils.exceptions import MissingEssentialProp
+from utils.prompt_encoder import IUPAC_NUCLEOTIDES, PromptEncoder
+from utils.trainer import LengthGroupedTrainer
 
 
 class Input(TypedDict):
@@ -30,10 +32,18 @@ class GenerateInput(TypedDict):
 	after: str | None
 	hide_prob: float | None
 
-class ExInClassifierGPT(BaseModel):
+class Prediction(TypedDict):
+	label: str
+	probabilities: dict[str, float]
+
+class ExInClassifierGPT(ChunkedClassifier, BaseModel):
 	model: GPT2LMHeadModel | None = None
 	tokenizer: GPT2Tokenizer | None = None
+	encoder: PromptEncoder | None = None
 	max_length = 1024
+	labels = ["EXON", "INTRON"]
+	onnx_inputs = ()
+	temperature = 1.0
 
 	def load_checkpoint(
 		self,
@@ -68,6 +78,7 @@ class ExInClassifierGPT(BaseModel):
 			return None
 		
 		self.model.resize_token_embeddings(len(self.tokenizer), mean_resizing=False)
+		self._set_encoder()
 
 	def from_pretrained(
 		self,
@@ -75,18 +86,34 @@ class ExInClassifierGPT(BaseModel):
 	) -> None:
 		self.model = GPT2LMHeadModel.from_pretrained(checkpoint)
 		self.tokenizer = GPT2Tokenizer.from_pretrained(checkpoint)
+		self._set_encoder()
+
+	def _set_encoder(self) -> None:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		self.encoder = PromptEncoder(
+			self.tokenizer,
+			{nucl: f"[{nucl}]" for nucl in IUPAC_NUCLEOTIDES}
+		)
 
 	def _process_sequence(
 		self,
 		sequence: str
-	) -> str:
-		return f"".join(f"[{nucl.upper()}]" for nucl in sequence)
+	) -> np.ndarray:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		return self.encoder.encode_sequence(sequence)
 
 	def _process_target(
 		self,
 		target: str
-	) -> str:
-		return f"[{target.upper()}]"
+	) -> np.ndarray:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		return self.encoder.encode_text(f"[{target.upper()}]")
 	
 	def _unprocess_target(
 		self,
@@ -123,90 +150,67 @@ class ExInClassifierGPT(BaseModel):
 		before: str | None = None,
 		after: str | None = None,
 		hide_prob: float = 0.01
-	) -> dict[Literal["partial", "complete"], str]:
-			output = f"<|SEQUENCE|>{self._process_sequence(sequence)}\n"
+	) -> dict[Literal["partial", "complete"], list[int]]:
+			if self.encoder is None:
+				raise MissingEssentialProp("Encoder missing.")
+
+			newline = self.encoder.encode_text("\n")
+			output = [
+				self.encoder.encode_text("<|SEQUENCE|>"),
+				self._process_sequence(sequence),
+				newline
+			]
 
 			if organism:
 				if random.random() > hide_prob:
-					output += f"<|ORGANISM|>{organism[:10]}\n"
+					output.append(self.encoder.encode_text(f"<|ORGANISM|>{organism[:10]}\n"))
 
 			if gene:
 				if random.random() > hide_prob:
-					output += f"<|GENE|>{gene[:10]}\n"
+					output.append(self.encoder.encode_text(f"<|GENE|>{gene[:10]}\n"))
 			
 			if before:
-				before = self._process_sequence(before)
 				if random.random() > hide_prob:
-					output += f"<|FLANK_BEFORE|>{before}\n"
+					output.append(self.encoder.encode_text("<|FLANK_BEFORE|>"))
+					output.append(self._process_sequence(before))
+					output.append(newline)
 			
 			if after:
-				after = self._process_sequence(after)
 				if random.random() > hide_prob:
-					output += f"<|FLANK_AFTER|>{after}\n"
+					output.append(self.encoder.encode_text("<|FLANK_AFTER|>"))
+					output.append(self._process_sequence(after))
+					output.append(newline)
 			
-			output += "<|TARGET|>"
+			output.append(self.encoder.encode_text("<|TARGET|>"))
 
 			return {
-				"partial": output,
-				"complete": f"{output}{(self._process_target(target) if target else '')}"
+				"partial": self.encoder.encode(output),
+				"complete": self.encoder.encode(output + ([self._process_target(target)] if target else []))
 			}
 
-	def _tokenize(
-		self,
-		input_text: str
-	) -> tuple[torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
-
-		tokenized = self.tokenizer(
-			input_text,
-			truncation=True,
-			max_length=self.max_length,
-			return_tensors="pt"
-		).to(self.model.device)
-
-		input_ids = tokenized["input_ids"]
-		input_ids = cast(torch.Tensor, input_ids)
-		attention_mask = tokenized["attention_mask"]
-		attention_mask = cast(torch.Tensor, attention_mask)
-
-		return (input_ids, attention_mask)
-
 	def _tokenize_for_training(
 		self,
-		input_text: str,
-		expected_text: str
-	) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
+		input_ids: list[int],
+		expected_ids: list[int]
+	) -> tuple[list[int], list[int], list[int]]:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		start = len(input_ids)
+		pad_token_id = self.tokenizer.pad_token_id
+
+		labels = [-100] * start + [
+			token_id if token_id != pad_token_id else -100
+			for token_id in expected_ids[start:]
+		]
 		
-		encoded_input = self.tokenizer(
-			input_text
-		)
-		encoded_expected = self.tokenizer(
-			expected_text
-		)
-
-		input_ids = torch.tensor(encoded_expected["input_ids"], dtype=torch.long)
-		attention_mask = torch.tensor(encoded_expected["attention_mask"], dtype=torch.bool)
+		return expected_ids, [1] * len(expected_ids), labels
 
-		labels = torch.full_like(input_ids, -100)
-
-		start = len(cast(list, encoded_input["input_ids"]))
-
-		for i in range(start, len(input_ids)):
-			if input_ids[i] != self.tokenizer.pad_token_id:
-				labels[i] = input_ids[i]
-		
-		return input_ids, attention_mask, labels
-
-	def _prepare_dataset(
+	def _generate_examples(
 		self,
 		dataset: list[Input]
-	) -> Dataset:
-		tokenized = []
-
-		for data in tqdm(dataset):
+	) -> Iterator[dict[str, list[int]]]:
+		for data in dataset:
 			promptfied = self._build_input(
 				sequence=data["sequence"],
 				target=data.get("target"),
@@ -217,18 +221,16 @@ class ExInClassifierGPT(BaseModel):
 				hide_prob=data.get("hide_prob") or 0.01
 			)
 			tokenized_input = self._tokenize_for_training(
-				input_text=promptfied["partial"],
-				expected_text=promptfied["complete"]
+				input_ids=promptfied["partial"],
+				expected_ids=promptfied["complete"]
 			)
 
 			input_ids, attention_mask, labels = tokenized_input
-			tokenized.append({
+			yield {
 				"input_ids": input_ids,
 				"attention_mask": attention_mask,
 				"labels": labels
-			})
-
-		return Dataset.from_list(tokenized)
+			}
 
 	def train(
 		self,
@@ -255,11 +257,13 @@ class ExInClassifierGPT(BaseModel):
 		if self.seed:
 			args.seed = self.seed
 
-		trainer = Trainer(
+		trainer = LengthGroupedTrainer(
 			model=self.model,
 			train_dataset=data,
 			args=args,
 			data_collator=DataCollatorForFT(self.tokenizer),
+			max_tokens=params.max_tokens,
+			group_by_length=params.group_by_length
 		)
 
 		self._log("Starting training...")
@@ -272,27 +276,130 @@ class ExInClassifierGPT(BaseModel):
 		self,
 		input: GenerateInput
 	) -> str:
+		return self.generate_batch([input], batch_size=1)[0]
+
+	def generate_batch(
+		self,
+		inputs: list[GenerateInput],
+		batch_size: int = 8
+	) -> list[str]:
+		return [prediction["label"] for prediction in self.score_batch(inputs, batch_size)]
+
+	def _label_logits(
+		self,
+		inputs: list[GenerateInput],
+		batch_size: int = 8
+	) -> torch.Tensor:
 		if self.model is None or self.tokenizer is None:
 			raise MissingEssentialProp("Model or Tokenizer missing.")
 		
-		model_input = self._build_input(
-			sequence=input["sequence"],
+		prompts = []
+		for input in inputs:
+			model_input = self._build_input(
+				sequence=input["sequence"],
+				organism=input.get("organism"),
+				gene=input.get("gene"),
+				before=input.get("before"),
+				after=input.get("after"),
+				hide_prob=input.get("hide_prob") or 0.01
+			)
+			prompts.append(model_input["partial"][:self.max_length])
+
+		label_ids = self.tokenizer.convert_tokens_to_ids([f"[{label}]" for label in self.labels])
+		logits = torch.zeros((len(prompts), len(self.labels)))
+
+		self.model.eval()
+		with torch.no_grad():
+			for batch in length_sorted_batches([len(p) for p in prompts], batch_size):
+				input_ids, attention_mask = self._pad_batch(
+					[prompts[i] for i in batch],
+					padding_side="left"
+				)
+				position_ids = (attention_mask.cumsum(dim=-1) - 1).clamp(min=0)
+
+				outputs = self.model(
+					input_ids=input_ids,
+					attention_mask=attention_mask,
+					position_ids=position_ids
+				)
+
+				logits[batch] = outputs.logits[:, -1, label_ids].float().cpu()
+		
+		return logits
+
+	def _class_logits(
+		self,
+		inputs: list[GenerateInput],
+		batch_size: int = 8
+	) -> torch.Tensor:
+		return self._label_logits(inputs, batch_size) / self.temperature
+
+	def _window_length(
+		self,
+		input: GenerateInput
+	) -> int:
+		overhead = self._build_input(
+			sequence="",
 			organism=input.get("organism"),
 			gene=input.get("gene"),
 			before=input.get("before"),
 			after=input.get("after"),
-			hide_prob=input.get("hide_prob") or 0.01
-		)
+			hide_prob=0
+		)["partial"]
 
-		input_ids, attention_mask = self._tokenize(model_input["partial"])
+		return max(1, self.max_length - len(overhead))
 
-		self.model.eval()
-		with torch.no_grad():
-			outputs = self.model.generate(
-				input_ids=input_ids,
-				attention_mask=attention_mask,
-				max_new_tokens=1,
-				pad_token_id=self.tokenizer.eos_token_id
-			)
-		
-		return self._unprocess_target(self.tokenizer.decode(outputs[0][-1]))
\ No newline at end of file
+	def score(
+		self,
+		input: GenerateInput
+	) -> Prediction:
+		return self.score_batch([input], batch_size=1)[0]
+
+	def score_batch(
+		self,
+		inputs: list[GenerateInput],
+		batch_size: int = 8
+	) -> list[Prediction]:
+		logits = self._class_logits(inputs, batch_size)
+		probabilities = torch.softmax(logits, dim=-1).tolist()
+
+		return [{
+			"label": self.labels[max(range(len(self.labels)), key=lambda i: row[i])],
+			"probabilities": dict(zip(self.labels, row))
+		} for row in probabilities]
+
+	def calibrate(
+		self,
+		dataset: list[Input],
+		batch_size: int = 8,
+		max_iter: int = 50
+	) -> float:
+		targets = [data["target"] for data in dataset]
+		if any(target is None for target in targets):
+			raise MissingEssentialProp("Target missing")
+
+		logits = self._label_logits([{
+			"sequence": data["sequence"],
+			"organism": data.get("organism"),
+			"gene": data.get("gene"),
+			"before": data.get("before"),
+			"after": data.get("after"),
+			"hide_prob": data.get("hide_prob")
+		} for data in dataset], batch_size)
+		labels = torch.tensor([self.labels.index(str(target).upper()) for target in targets])
+
+		log_temperature = torch.zeros(1, requires_grad=True)
+		optimizer = torch.optim.LBFGS([log_temperature], lr=0.1, max_iter=max_iter)
+
+		def closure() -> torch.Tensor:
+			optimizer.zero_grad()
+			loss = torch.nn.functional.cross_entropy(logits / log_temperature.exp(), labels)
+			loss.backward()
+			return loss
+
+		optimizer.step(closure)
+
+		self.temperature = float(log_temperature.exp().item())
+		self._log(f"Calibrated temperature: {self.temperature:.4f}")
+
+		return self.temperature
\ No newline at end of file
@@ -1,16 +1,19 @@
 import random
-from collections import defaultdict
-from typing import TypedDict, cast
+from itertools import islice
+from typing import Any, Iterator, TypedDict
 
+import numpy as np
 import torch
-from datasets import Dataset
-from tqdm import tqdm
+from torch.utils.data import Dataset as TorchDataset
 from transformers import (BertForSequenceClassification, BertTokenizer,
-                          DataCollatorWithPadding, Trainer, TrainingArguments)
+                          DataCollatorWithPadding, TrainerCallback,
+                          TrainerControl, TrainerState, TrainingArguments)
 
 from llms.base import BaseModel
 from schemas.train_params import TrainParams
 from utils.exceptions import MissingEssentialProp
+from utils.prompt_encoder import PromptEncoder
+from utils.trainer import LengthGroupedTrainer
 
 
 class Input(TypedDict):
@@ -39,15 +42,68 @@ NUCLEOTIDE_MAP = {
 	"U": "[DNA_UNKNOWN]"
 }
 
+LABELS = "EIU"
+
+LABEL_IDS = np.full(256, -1, dtype=np.int64)
+for label_id, label in enumerate(LABELS):
+	LABEL_IDS[ord(label)] = label_id
+
+def sample_positions(
+	class_positions: list[np.ndarray],
+	records_per_sequence: int,
+	rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+	per_class = max(1, records_per_sequence // len(class_positions))
+
+	positions = []
+	labels = []
+	for label, candidates in enumerate(class_positions):
+		sampled = rng.choice(candidates, size=min(per_class, len(candidates)), replace=False)
+		positions.append(sampled)
+		labels.append(np.full(len(sampled), label, dtype=np.int64))
+
+	order = rng.permutation(sum(len(sampled) for sampled in positions))
+	return np.concatenate(positions)[order], np.concatenate(labels)[order]
+
+def build_window(
+	encoder: PromptEncoder,
+	sequence_ids: np.ndarray,
+	position: int,
+	organism_ids: np.ndarray | None,
+	flank_size: int,
+	max_length: int
+) -> list[int]:
+	output = [
+		encoder.encode_text("<|SEQUENCE|>"),
+		sequence_ids[position:position + 1],
+		encoder.encode_text("<|FLANK_BEFORE|>"),
+		sequence_ids[max(position - flank_size, 0):position],
+		encoder.encode_text("<|FLANK_AFTER|>"),
+		sequence_ids[position + 1:min(position + flank_size, len(sequence_ids))]
+	]
+	
+	if organism_ids is not None:
+		output.append(organism_ids)
+	
+	output.append(encoder.encode_text("<|TARGET|>"))
+
+	return encoder.encode(output, max_length=max_length)
+
 class NuclBERT(BaseModel):
+	tokenizer_class = BertTokenizer
+	encoder: PromptEncoder | None = None
 	max_length = 512
 	flank_size = 16
 	records_per_sequence = 50
 	num_labels = 3
+	labels = list(LABELS)
+	inference_batch_size = 64
+	resample_windows = False
 	
 	def load_checkpoint(
 		self,
-		checkpoint: str
+		checkpoint: str,
+		quantize: bool = False
 	) -> None:
 		self.model = BertForSequenceClassification.from_pretrained(
 			checkpoint,
@@ -80,23 +136,41 @@ class NuclBERT(BaseModel):
 		})
 
 		self.model.resize_token_embeddings(len(self.tokenizer), mean_resizing=False)
+		self._set_encoder()
+
+		if quantize:
+			self._quantize()
 
 	def from_pretrained(
 		self,
-		checkpoint: str
+		checkpoint: str,
+		quantize: bool = False
 	) -> None:
-		self.model = BertForSequenceClassification.from_pretrained(checkpoint)
+		self.model = self._load_model(BertForSequenceClassification, checkpoint)
 		self.tokenizer = BertTokenizer.from_pretrained(checkpoint)
+		self._set_encoder()
+
+		if quantize:
+			self._quantize()
+
+	def _set_encoder(self) -> None:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		self.encoder = PromptEncoder(
+			self.tokenizer,
+			NUCLEOTIDE_MAP,
+			fallback_token="[DNA_INVALID]"
+		)
 	
 	def _process_sequence(
 		self,
 		sequence: str
-	) -> str:
-		result = []
-		for nucl in sequence.upper():
-			token = NUCLEOTIDE_MAP.get(nucl, "[DNA_INVALID]")
-			result.append(token)
-		return "".join(result)
+	) -> np.ndarray:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		return self.encoder.encode_sequence(sequence)
 	
 	def _process_target(
 		self,
@@ -133,135 +207,137 @@ class NuclBERT(BaseModel):
 			"organism": organism
 		}
 
-	def _build_input(
+	def _dataset_settings(self) -> dict[str, Any]:
+		return {
+			**super()._dataset_settings(),
+			"flank_size": self.flank_size,
+			"records_per_sequence": self.records_per_sequence,
+			"num_labels": self.num_labels
+		}
+
+	def _class_positions(
 		self,
-		sequence: str,
-		flank_before: str,
-		flank_after: str,
-		target: str | None = None,
-		organism: str | None = None
-	) -> tuple[str, int | None]:
-		output = f"<|SEQUENCE|>{self._process_sequence(sequence)}"
-		
-		output += f"<|FLANK_BEFORE|>{self._process_sequence(flank_before)}"
-		
-		output += f"<|FLANK_AFTER|>{self._process_sequence(flank_after)}"
-		
-		if organism:
-			output += f"<|ORGANISM|>{organism[:10].lower()}"
-		
-		output += "<|TARGET|>"
+		sequence_length: int,
+		target: str
+	) -> list[np.ndarray]:
+		codes = LABEL_IDS[np.frombuffer(target[:sequence_length].encode("ascii", errors="replace"), dtype=np.uint8)]
+		if len(codes) < sequence_length or (codes < 0).any():
+			raise ValueError("Could not find a valid label.")
 
-		label = None
-		if target:
-			label = self._process_target(target)
-		
-		return output, label
+		return [np.flatnonzero(codes == label) for label in range(self.num_labels)]
 
-	def _tokenize(
+	def _sample_positions(
 		self,
-		input_text: str
-	) -> tuple[torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
+		class_positions: list[np.ndarray],
+		rng: np.random.Generator
+	) -> tuple[np.ndarray, np.ndarray]:
+		return sample_positions(class_positions, self.records_per_sequence, rng)
 
-		tokenized = self.tokenizer(
-			input_text,
-			truncation=True,
-			max_length=self.max_length,
-			return_tensors="pt"
-		).to(self.model.device)
+	def _organism_ids(
+		self,
+		organism: str | None
+	) -> np.ndarray | None:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
 
-		input_ids = tokenized["input_ids"]
-		input_ids = cast(torch.Tensor, input_ids)
-		attention_mask = tokenized["attention_mask"]
-		attention_mask = cast(torch.Tensor, attention_mask)
+		if not organism:
+			return None
+		return self.encoder.encode_text(f"<|ORGANISM|>{organism[:10].lower()}")
 
-		return (input_ids, attention_mask)
+	def _build_input(
+		self,
+		sequence_ids: np.ndarray,
+		position: int,
+		organism_ids: np.ndarray | None = None
+	) -> list[int]:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		return build_window(
+			self.encoder,
+			sequence_ids,
+			position,
+			organism_ids,
+			self.flank_size,
+			self.max_length
+		)
 
 	def _tokenize_for_training(
 		self,
-		sentence: str,
+		input_ids: list[int],
 		target: int
-	) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
-		if self.model is None or self.tokenizer is None:
-			raise MissingEssentialProp("Model or Tokenizer missing.")
-		
-		encoded_input = self.tokenizer(
-			sentence,
-			return_tensors="pt"
-		)
+	) -> tuple[list[int], list[int], list[int]]:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
 
-		label = torch.tensor([target], dtype=torch.long)
-
-		return (
-			encoded_input["input_ids"].squeeze(0),
-			encoded_input["attention_mask"].squeeze(0),
-			label
-		)
+		return input_ids, [1] * len(input_ids), [target]
 	
-	def _prepare_dataset(
+	def _generate_examples(
 		self,
-		data: list[Input]
-	) -> Dataset:
-		tokenized_dataset = []
-		per_class = max(1, self.records_per_sequence // self.num_labels)
-		
-		for register in tqdm(data):
+		dataset: list[Input]
+	) -> Iterator[dict[str, list[int]]]:
+		for register in dataset:
 			sequence = register["sequence"]
 			target = register["target"]
-			organism = register["organism"]
 
 			if target == None:
 				raise MissingEssentialProp("Target missing")
 
-			class_counts = defaultdict(int)
-
-			indices = list(range(len(sequence)))
-			random.shuffle(indices)
-
-			for i in indices:
-				cropped_target = target[i]
-				label = self._process_target(cropped_target)
-
-				if class_counts[label] >= per_class:
-					continue
-
-				flank_start = max(i - self.flank_size, 0)
-				flank_end = min(i + self.flank_size, len(sequence))
-				
-				flank_before = sequence[flank_start:i]
-				flank_after = sequence[i+1:flank_end]
-				
-				sentence, label_id = self._build_input(
-					sequence=sequence[i],
-					flank_before=flank_before,
-					flank_after=flank_after,
-					target=cropped_target,
-					organism=organism
-				)
+			sequence_ids = self._process_sequence(sequence)
+			organism_ids = self._organism_ids(register["organism"])
+			rng = np.random.default_rng(random.getrandbits(64))
 
-				assert label_id is not None
+			positions, labels = self._sample_positions(self._class_positions(len(sequence), target), rng)
 
+			for position, label in zip(positions.tolist(), labels.tolist()):
 				tokenized_input = self._tokenize_for_training(
-					sentence=sentence,
-					target=label_id
+					input_ids=self._build_input(sequence_ids, position, organism_ids),
+					target=label
 				)
 
-				input_ids, attention_mask, labels = tokenized_input
+				input_ids, attention_mask, labels_ids = tokenized_input
 
-				tokenized_dataset.append({
+				yield {
 					"input_ids": input_ids,
 					"attention_mask": attention_mask,
-					"labels": labels
-				})
+					"labels": labels_ids
+				}
 
-				class_counts[label] += 1
-
-				if all(class_counts[c] >= per_class for c in range(self.num_labels)):
-					break
+	def _window_dataset(
+		self,
+		dataset: list[Input]
+	) -> "NuclWindowDataset":
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		sequences = []
+		organisms = []
+		class_positions = []
+		for register in dataset:
+			target = register["target"]
+			if target is None:
+				raise MissingEssentialProp("Target missing")
 
-		return Dataset.from_list(tokenized_dataset)
+			sequence_ids = self._process_sequence(register["sequence"])
+			sequences.append(sequence_ids)
+			organisms.append(self._organism_ids(register["organism"]))
+			class_positions.append([
+				positions.astype(np.int32)
+				for positions in self._class_positions(len(sequence_ids), target)
+			])
+
+		seed = self.seed if self.seed is not None else random.getrandbits(64)
+
+		return NuclWindowDataset(
+			self.encoder,
+			sequences,
+			organisms,
+			class_positions,
+			flank_size=self.flank_size,
+			max_length=self.max_length,
+			records_per_sequence=self.records_per_sequence,
+			seed=seed
+		)
 
 	def train(
 		self,
@@ -271,15 +347,33 @@ class NuclBERT(BaseModel):
 		if not self.model or not self.tokenizer:
 			raise MissingEssentialProp("Model or Tokenizer missing.")
 		
+		group_by_length = params.group_by_length
+		max_tokens = params.max_tokens
+		if self.resample_windows and (group_by_length or max_tokens is not None):
+			# resampled windows change every epoch, so there are no fixed
+			# lengths to group by
+			self._log(
+				"resample_windows does not support length grouping; "
+				"falling back to the default sampler.",
+				"WARNING"
+			)
+			group_by_length = False
+			max_tokens = None
+
 		self._log("Preparing dataset...")
-		data = self._prepare_dataset(dataset)
+		callbacks = []
+		if self.resample_windows:
+			data = self._window_dataset(dataset)
+			callbacks.append(ResampleWindowsCallback(data))
+		else:
+			data = self._prepare_dataset(dataset)
 		self._log("Dataset prepared!")
 		
 		args = TrainingArguments(
 			num_train_epochs=params.epochs,
 			optim=params.optim,
 			learning_rate=params.lr,
-			per_device_eval_batch_size=params.batch_size,
+			per_device_train_batch_size=params.batch_size,
 			gradient_accumulation_steps=params.gradient_accumulation,
 			lr_scheduler_type="cosine",
 			save_strategy="no"
@@ -288,11 +382,14 @@ class NuclBERT(BaseModel):
 		if self.seed:
 			args.seed = self.seed
 		
-		trainer = Trainer(
+		trainer = LengthGroupedTrainer(
 			model=self.model,
 			train_dataset=data,
 			args=args,
-			data_collator=DataCollatorWithPadding(self.tokenizer)
+			data_collator=DataCollatorWithPadding(self.tokenizer),
+			callbacks=callbacks,
+			max_tokens=max_tokens,
+			group_by_length=group_by_length
 		)
 
 		self._log("Starting training...")
@@ -305,48 +402,130 @@ class NuclBERT(BaseModel):
 		self,
 		data: Input
 	) -> str:
+		return self.generate_batch([data], batch_size=1)[0]
+
+	def _iter_windows(
+		self,
+		inputs: list[Input]
+	) -> Iterator[tuple[int, list[int]]]:
+		for index, data in enumerate(inputs):
+			sequence_ids = self._process_sequence(data["sequence"])
+			organism_ids = self._organism_ids(data["organism"])
+
+			for position in range(len(sequence_ids)):
+				yield index, self._build_input(sequence_ids, position, organism_ids)
+
+	def generate_batch(
+		self,
+		inputs: list[Input],
+		batch_size: int = 8
+	) -> list[str]:
 		if self.model is None or self.tokenizer is None:
 			raise MissingEssentialProp("Model or Tokenizer missing.")
 		
 		self.model.eval()
 
-		sequence = data["sequence"]
-		organism = data["organism"]
+		labels: list[list[str]] = [[] for _ in inputs]
 
-		predicted = ""
-		
 		with torch.no_grad():
-			for i, nucl in enumerate(sequence):	
-				flank_start = max(i - self.flank_size, 0)
-				flank_end = min(i + self.flank_size, len(sequence))
-				
-				flank_before = sequence[flank_start:i]
-				flank_after = sequence[i+1:flank_end]
-				
-				flank_before = self._process_sequence(flank_before)
-				flank_after = self._process_sequence(flank_after)
-
-				sentence, _ = self._build_input(
-					sequence=nucl,
-					flank_before=flank_before,
-					flank_after=flank_after,
-					organism=organism
-				)
+			for start in range(0, len(inputs), batch_size):
+				windows = self._iter_windows(inputs[start:start + batch_size])
 
-				tokenized_input = self._tokenize(sentence)
+				while chunk := list(islice(windows, self.inference_batch_size)):
+					input_ids, attention_mask = self._pad_batch([window for _, window in chunk])
 
-				input_ids, _ = tokenized_input
+					outputs = self.model(
+						input_ids=input_ids,
+						attention_mask=attention_mask
+					)
+					pred_ids = torch.argmax(outputs.logits, dim=-1).tolist()
 
-				outputs = self.model(
-					input_ids=input_ids
-				)
-				pred_id = torch.argmax(outputs.logits, dim=-1).item()
+					for (index, _), pred_id in zip(chunk, pred_ids):
+						labels[start + index].append(LABELS[int(pred_id)])
 
-				predicted += self._unprocess_target(int(pred_id))
+		return ["".join(sequence_labels) for sequence_labels in labels]
 
-			predicted = (
-				predicted.replace("[EXON]", "E")
-				.replace("[INTRON]", "I")
-				.replace("[DNA_UNKNOWN]", "U")
-			)
-			return predicted
\ No newline at end of file
+
+class NuclWindowDataset(TorchDataset):
+	def __init__(
+		self,
+		encoder: PromptEncoder,
+		sequences: list[np.ndarray],
+		organisms: list[np.ndarray | None],
+		class_positions: list[list[np.ndarray]],
+		flank_size: int,
+		max_length: int,
+		records_per_sequence: int,
+		seed: int
+	) -> None:
+		self.encoder = encoder
+		self.flank_size = flank_size
+		self.max_length = max_length
+		self.records_per_sequence = records_per_sequence
+		self.seed = seed
+
+		self._sequences = sequences
+		self._organisms = organisms
+		self._class_positions = class_positions
+
+		self.resample(0)
+
+	def resample(
+		self,
+		epoch: int
+	) -> None:
+		rng = np.random.default_rng((self.seed, epoch))
+
+		records = []
+		positions = []
+		labels = []
+		for record, class_positions in enumerate(self._class_positions):
+			sampled_positions, sampled_labels = sample_positions(class_positions, self.records_per_sequence, rng)
+			records.append(np.full(len(sampled_positions), record, dtype=np.int64))
+			positions.append(sampled_positions)
+			labels.append(sampled_labels)
+
+		order = rng.permutation(sum(len(record) for record in records))
+		self._records = np.concatenate(records)[order] if records else np.empty(0, dtype=np.int64)
+		self._positions = np.concatenate(positions)[order] if positions else np.empty(0, dtype=np.int64)
+		self._labels = np.concatenate(labels)[order] if labels else np.empty(0, dtype=np.int64)
+
+	def __len__(self) -> int:
+		return len(self._records)
+
+	def __getitem__(
+		self,
+		index: int
+	) -> dict[str, list[int]]:
+		record = int(self._records[index])
+		input_ids = build_window(
+			self.encoder,
+			self._sequences[record],
+			int(self._positions[index]),
+			self._organisms[record],
+			self.flank_size,
+			self.max_length
+		)
+
+		return {
+			"input_ids": input_ids,
+			"attention_mask": [1] * len(input_ids),
+			"labels": [int(self._labels[index])]
+		}
+
+
+class ResampleWindowsCallback(TrainerCallback):
+	def __init__(
+		self,
+		dataset: NuclWindowDataset
+	) -> None:
+		self.dataset = dataset
+
+	def on_epoch_begin(
+		self,
+		args: TrainingArguments,
+		state: TrainerState,
+		control: TrainerControl,
+		**kwargs
+	) -> None:
+		self.dataset.resample(int(state.epoch or 0))
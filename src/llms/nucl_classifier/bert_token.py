@@ -0,0 +1,288 @@
+from typing import Any, Iterator
+
+import numpy as np
+import torch
+from transformers import (BertForTokenClassification, BertTokenizer,
+                          DataCollatorForTokenClassification,
+                          TrainingArguments)
+
+from llms.base import BaseModel
+from llms.nucl_classifier.bert import NUCLEOTIDE_MAP, Input
+from schemas.train_params import TrainParams
+from utils.batching import length_sorted_batches
+from utils.chunking import window_spans
+from utils.exceptions import MissingEssentialProp
+from utils.prompt_encoder import PromptEncoder
+from utils.trainer import LengthGroupedTrainer
+
+LABELS = "EIU"
+
+LABEL_IDS = np.full(256, -100, dtype=np.int64)
+for label_id, label in enumerate(LABELS):
+	LABEL_IDS[ord(label)] = label_id
+
+
+class NuclBERTToken(BaseModel):
+	model: BertForTokenClassification | None = None
+	tokenizer: BertTokenizer | None = None
+	tokenizer_class = BertTokenizer
+	encoder: PromptEncoder | None = None
+	max_length = 512
+	chunk_overlap = 64
+	num_labels = len(LABELS)
+	labels = list(LABELS)
+	inference_batch_size = 16
+
+	def load_checkpoint(
+		self,
+		checkpoint: str,
+		quantize: bool = False
+	) -> None:
+		self.model = BertForTokenClassification.from_pretrained(
+			checkpoint,
+			num_labels=self.num_labels
+		)
+
+		self.tokenizer = BertTokenizer.from_pretrained(
+			checkpoint,
+			do_lower_case=False
+		)
+
+		special_tokens = [
+			"[DNA_A]", "[DNA_C]", "[DNA_G]", "[DNA_T]",
+			"[DNA_R]", "[DNA_Y]", "[DNA_S]", "[DNA_W]",
+			"[DNA_K]", "[DNA_M]", "[DNA_B]", "[DNA_D]",
+			"[DNA_H]", "[DNA_V]", "[DNA_N]", "[INTRON]",
+			"[EXON]", "[DNA_PAD]", "[DNA_UNKNOWN]", "[DNA_INVALID]"]
+		self.tokenizer.add_tokens(special_tokens)
+
+		self.tokenizer.add_special_tokens({
+			"additional_special_tokens": [
+				"<|SEQUENCE|>",
+				"<|ORGANISM|>"
+			]
+		})
+
+		self.model.resize_token_embeddings(len(self.tokenizer), mean_resizing=False)
+		self._set_encoder()
+
+		if quantize:
+			self._quantize()
+
+	def from_pretrained(
+		self,
+		checkpoint: str,
+		quantize: bool = False
+	) -> None:
+		self.model = self._load_model(BertForTokenClassification, checkpoint)
+		self.tokenizer = BertTokenizer.from_pretrained(checkpoint)
+		self._set_encoder()
+
+		if quantize:
+			self._quantize()
+
+	def _set_encoder(self) -> None:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		self.encoder = PromptEncoder(
+			self.tokenizer,
+			NUCLEOTIDE_MAP,
+			fallback_token="[DNA_INVALID]"
+		)
+
+	def build_input(
+		self,
+		sequence: str,
+		target: str | None = None,
+		organism: str | None = None
+	) -> Input:
+		return {
+			"sequence": sequence,
+			"target": target,
+			"organism": organism
+		}
+
+	def _dataset_settings(self) -> dict[str, Any]:
+		return {
+			**super()._dataset_settings(),
+			"chunk_overlap": self.chunk_overlap,
+			"num_labels": self.num_labels
+		}
+
+	def _prefix(
+		self,
+		organism: str | None
+	) -> list[np.ndarray]:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		prefix = []
+		if organism:
+			prefix.append(self.encoder.encode_text(f"<|ORGANISM|>{organism[:10].lower()}"))
+		prefix.append(self.encoder.encode_text("<|SEQUENCE|>"))
+
+		return prefix
+
+	def _window_length(
+		self,
+		organism: str | None
+	) -> int:
+		if self.tokenizer is None:
+			raise MissingEssentialProp("Tokenizer missing.")
+
+		overhead = sum(len(part) for part in self._prefix(organism)) + self.tokenizer.num_special_tokens_to_add()
+
+		return max(1, self.max_length - overhead)
+
+	def _build_input(
+		self,
+		sequence: str,
+		organism: str | None = None,
+		target: str | None = None
+	) -> tuple[list[int], int, list[int] | None]:
+		if self.encoder is None:
+			raise MissingEssentialProp("Encoder missing.")
+
+		prefix = self._prefix(organism)
+		input_ids = self.encoder.encode(prefix + [self.encoder.encode_sequence(sequence)])
+		start = 1 + sum(len(part) for part in prefix)
+
+		labels = None
+		if target is not None:
+			codes = LABEL_IDS[np.frombuffer(target.encode("ascii", errors="replace"), dtype=np.uint8)]
+			labels = [-100] * len(input_ids)
+			labels[start:start + len(codes)] = codes.tolist()
+
+		return input_ids, start, labels
+
+	def _generate_examples(
+		self,
+		dataset: list[Input]
+	) -> Iterator[dict[str, list[int]]]:
+		for register in dataset:
+			sequence = register["sequence"]
+			target = register["target"]
+			organism = register["organism"]
+
+			if target is None:
+				raise MissingEssentialProp("Target missing")
+
+			window = self._window_length(organism)
+			for start, end in window_spans(len(sequence), window):
+				input_ids, _, labels = self._build_input(
+					sequence=sequence[start:end],
+					organism=organism,
+					target=target[start:end]
+				)
+
+				assert labels is not None
+
+				yield {
+					"input_ids": input_ids,
+					"attention_mask": [1] * len(input_ids),
+					"labels": labels
+				}
+
+	def train(
+		self,
+		dataset: list[Input],
+		params: TrainParams
+	) -> None:
+		if not self.model or not self.tokenizer:
+			raise MissingEssentialProp("Model or Tokenizer missing.")
+
+		self._log("Preparing dataset...")
+		data = self._prepare_dataset(dataset)
+		self._log("Dataset prepared!")
+
+		args = TrainingArguments(
+			num_train_epochs=params.epochs,
+			optim=params.optim,
+			learning_rate=params.lr,
+			per_device_train_batch_size=params.batch_size,
+			gradient_accumulation_steps=params.gradient_accumulation,
+			lr_scheduler_type="cosine",
+			save_strategy="no"
+		)
+
+		if self.seed:
+			args.seed = self.seed
+
+		trainer = LengthGroupedTrainer(
+			model=self.model,
+			train_dataset=data,
+			args=args,
+			data_collator=DataCollatorForTokenClassification(self.tokenizer),
+			max_tokens=params.max_tokens,
+			group_by_length=params.group_by_length
+		)
+
+		self._log("Starting training...")
+
+		trainer.train()
+
+		self._log("Training complete. You may save the model for later usage.")
+
+	def generate(
+		self,
+		data: Input
+	) -> str:
+		return self.generate_batch([data], batch_size=1)[0]
+
+	def _windows(
+		self,
+		inputs: list[Input]
+	) -> list[tuple[int, int, int, int, list[int]]]:
+		windows = []
+		for index, data in enumerate(inputs):
+			sequence = data["sequence"]
+			organism = data["organism"]
+
+			window = self._window_length(organism)
+			for start, end in window_spans(len(sequence), window, min(self.chunk_overlap, window - 1)):
+				input_ids, offset, _ = self._build_input(
+					sequence=sequence[start:end],
+					organism=organism
+				)
+				windows.append((index, start, end, offset, input_ids))
+
+		return windows
+
+	def generate_batch(
+		self,
+		inputs: list[Input],
+		batch_size: int = 8
+	) -> list[str]:
+		if self.model is None or self.tokenizer is None:
+			raise MissingEssentialProp("Model or Tokenizer missing.")
+
+		self.model.eval()
+
+		logits = [torch.zeros((len(data["sequence"]), self.num_labels)) for data in inputs]
+		counts = [torch.zeros((len(data["sequence"]), 1)) for data in inputs]
+
+		with torch.no_grad():
+			for first in range(0, len(inputs), batch_size):
+				windows = self._windows(inputs[first:first + batch_size])
+
+				for batch in length_sorted_batches([len(w[-1]) for w in windows], self.inference_batch_size):
+					input_ids, attention_mask = self._pad_batch([windows[i][-1] for i in batch])
+
+					outputs = self.model(
+						input_ids=input_ids,
+						attention_mask=attention_mask
+					)
+					batch_logits = outputs.logits.float().cpu()
+
+					for row, i in enumerate(batch):
+						index, start, end, offset, _ = windows[i]
+						logits[first + index][start:end] += batch_logits[row, offset:offset + end - start]
+						counts[first + index][start:end] += 1
+
+		results = []
+		for sequence_logits, sequence_counts in zip(logits, counts):
+			label_ids = (sequence_logits / sequence_counts.clamp(min=1)).argmax(dim=-1).tolist()
+			results.append("".join(LABELS[label_id] for label_id in label_ids))
+
+		return results
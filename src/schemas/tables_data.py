@@ -16,6 +16,7 @@ class ExInSequence(TypedDict):
 	strand: Optional[int]
 	before: str
 	after: str
+	cds_index: int
 
 class DNASequence(TypedDict):
 	sequence: str
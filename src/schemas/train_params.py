@@ -11,4 +11,6 @@ class TrainParams:
   optim: Literal[
     "adamw_torch",
     "sgd",
-  ] = "adamw_torch"
\ No newline at end of file
+  ] = "adamw_torch"
+  max_tokens: int | None = None
+  group_by_length: bool = True
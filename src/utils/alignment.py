@@ -0,0 +1,187 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from Bio.Align import substitution_matrices
+
+from utils.batching import length_sorted_batches
+from utils.blast_analysis import _empty_result
+
+NEG_INF = -(1 << 30)
+
+
+@lru_cache(maxsize=1)
+def blosum62_lookup() -> np.ndarray:
+	matrix = substitution_matrices.load("BLOSUM62")
+	unknown = matrix.alphabet.index("X")
+
+	codes = np.full(256, unknown, dtype=np.int64)
+	for index, symbol in enumerate(matrix.alphabet):
+		codes[ord(symbol)] = index
+		codes[ord(symbol.lower())] = index
+
+	scores = np.asarray(matrix, dtype=np.int64)
+
+	return scores[codes[:, None], codes[None, :]]
+
+
+def _encode_batch(sequences: list[str]) -> tuple[np.ndarray, np.ndarray]:
+	lengths = np.array([len(sequence) for sequence in sequences], dtype=np.int64)
+	codes = np.zeros((len(sequences), max(int(lengths.max()), 1)), dtype=np.uint8)
+
+	for row, sequence in enumerate(sequences):
+		codes[row, :len(sequence)] = np.frombuffer(sequence.encode("ascii", errors="replace"), dtype=np.uint8)
+
+	return codes, lengths
+
+
+def smith_waterman_batch(
+	queries: list[str],
+	subjects: list[str],
+	gap_open: int = 11,
+	gap_extend: int = 1
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+	lookup = blosum62_lookup()
+
+	query_codes, query_lengths = _encode_batch(queries)
+	subject_codes, subject_lengths = _encode_batch(subjects)
+
+	batch, width = subject_codes.shape
+	columns = np.arange(width, dtype=np.int64)
+	valid_columns = columns[None, :] < subject_lengths[:, None]
+	width_base = width + 1
+
+	h = np.zeros((batch, width), dtype=np.int64)
+	h_matches = np.zeros_like(h)
+	h_length = np.zeros_like(h)
+	f = np.full_like(h, NEG_INF)
+	f_matches = np.zeros_like(h)
+	f_length = np.zeros_like(h)
+
+	best = np.zeros(batch, dtype=np.int64)
+	best_matches = np.zeros_like(best)
+	best_length = np.zeros_like(best)
+
+	rows = np.arange(batch)[:, None]
+
+	for i in range(query_codes.shape[1]):
+		residues = query_codes[:, i]
+		substitution = lookup[residues[:, None], subject_codes]
+		substitution[~valid_columns] = NEG_INF
+		identical = (residues[:, None] == subject_codes) & valid_columns
+
+		open_f = h - gap_open - gap_extend
+		extend_f = f - gap_extend
+		use_open = open_f >= extend_f
+		f = np.where(use_open, open_f, extend_f)
+		f_matches = np.where(use_open, h_matches, f_matches)
+		f_length = np.where(use_open, h_length, f_length) + 1
+
+		diag = np.zeros_like(h)
+		diag_matches = np.zeros_like(h)
+		diag_length = np.zeros_like(h)
+		diag[:, 1:] = h[:, :-1]
+		diag_matches[:, 1:] = h_matches[:, :-1]
+		diag_length[:, 1:] = h_length[:, :-1]
+		diag = diag + substitution
+		diag_matches = diag_matches + identical
+		diag_length = diag_length + 1
+
+		use_diag = diag >= f
+		h_row = np.maximum(np.maximum(diag, f), 0)
+		h_row_matches = np.where(h_row == 0, 0, np.where(use_diag, diag_matches, f_matches))
+		h_row_length = np.where(h_row == 0, 0, np.where(use_diag, diag_length, f_length))
+
+		# horizontal gaps never start inside another horizontal gap when
+		# gap_open >= 0, so a running maximum over the row resolves them
+		origin = (h_row + gap_extend * columns) * width_base + columns
+		origin = np.maximum.accumulate(origin, axis=1)
+		source = origin % width_base
+		e = np.full_like(h, NEG_INF)
+		e[:, 1:] = (origin[:, :-1] // width_base) - gap_open - gap_extend * columns[1:]
+		source = np.concatenate([np.zeros((batch, 1), dtype=np.int64), source[:, :-1]], axis=1)
+		e_matches = h_row_matches[rows, source]
+		e_length = h_row_length[rows, source] + columns - source
+
+		use_e = e > h_row
+		h = np.where(use_e, e, h_row)
+		h_matches = np.where(use_e, e_matches, h_row_matches)
+		h_length = np.where(use_e, e_length, h_row_length)
+
+		active = (i < query_lengths)[:, None] & valid_columns
+		candidate = np.where(active, h, 0)
+		position = candidate.argmax(axis=1)
+		score = candidate[np.arange(batch), position]
+		improved = score > best
+		best = np.where(improved, score, best)
+		best_matches = np.where(improved, h_matches[np.arange(batch), position], best_matches)
+		best_length = np.where(improved, h_length[np.arange(batch), position], best_length)
+
+	return best, best_matches, best_length
+
+
+def _score_batch(
+	arguments: tuple[list[str], list[str], int, int]
+) -> list[dict]:
+	preds, targets, gap_open, gap_extend = arguments
+	scores, matches, lengths = smith_waterman_batch(preds, targets, gap_open, gap_extend)
+
+	results = []
+	for pred, target, score, identities, aligned_len in zip(preds, targets, scores, matches, lengths):
+		if score <= 0:
+			results.append(_empty_result("No hit"))
+			continue
+
+		aligned_len = int(aligned_len)
+
+		results.append({
+			"blast_identity": f"{100.0 * identities / aligned_len:.2f}",
+			"blast_score": str(int(score)),
+			"cov_target": round(100.0 * aligned_len / len(target), 2),
+			"cov_pred": round(100.0 * aligned_len / len(pred), 2),
+			"alignment": f"pred vs target len={aligned_len}"
+		})
+
+	return results
+
+
+def alignment_analysis(
+	preds: list[str],
+	targets: list[str],
+	batch_size: int = 64,
+	num_workers: int | None = None,
+	gap_open: int = 11,
+	gap_extend: int = 1
+) -> list[dict]:
+	if len(preds) != len(targets):
+		raise ValueError("preds and targets must have the same length.")
+
+	results = [_empty_result() for _ in preds]
+
+	pairs = [
+		(index, pred.strip(), target.strip())
+		for index, (pred, target) in enumerate(zip(preds, targets))
+		if pred.strip() and target.strip()
+	]
+	if not pairs:
+		return results
+
+	batches = list(length_sorted_batches([len(pred) * len(target) for _, pred, target in pairs], batch_size))
+	jobs = [
+		([pairs[i][1] for i in batch], [pairs[i][2] for i in batch], gap_open, gap_extend)
+		for batch in batches
+	]
+
+	num_workers = num_workers or os.cpu_count() or 1
+	if num_workers > 1 and len(jobs) > 1:
+		with ProcessPoolExecutor(max_workers=min(num_workers, len(jobs))) as executor:
+			scored = list(executor.map(_score_batch, jobs))
+	else:
+		scored = [_score_batch(job) for job in jobs]
+
+	for batch, batch_results in zip(batches, scored):
+		for i, result in zip(batch, batch_results):
+			results[pairs[i][0]] = result
+
+	return results
@@ -0,0 +1,99 @@
+from typing import Iterator, Sequence
+
+import numpy as np
+from torch.utils.data import Sampler
+
+
+def length_sorted_batches(
+	lengths: Sequence[int],
+	batch_size: int
+) -> Iterator[list[int]]:
+	if batch_size < 1:
+		raise ValueError("batch_size must be at least 1.")
+
+	order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+	for start in range(0, len(order), batch_size):
+		yield order[start:start + batch_size]
+
+
+class LengthGroupedBatchSampler(Sampler[list[int]]):
+	def __init__(
+		self,
+		lengths: Sequence[int],
+		batch_size: int | None = None,
+		max_tokens: int | None = None,
+		shuffle: bool = True,
+		seed: int = 0,
+		bucket_size: int = 1024
+	) -> None:
+		if batch_size is None and max_tokens is None:
+			raise ValueError("Either batch_size or max_tokens must be provided.")
+		if batch_size is not None and batch_size < 1:
+			raise ValueError("batch_size must be at least 1.")
+		if max_tokens is not None and max_tokens < 1:
+			raise ValueError("max_tokens must be at least 1.")
+
+		self.lengths = np.asarray(lengths, dtype=np.int64)
+		self.batch_size = batch_size
+		self.max_tokens = max_tokens
+		self.shuffle = shuffle
+		self.seed = seed
+		self.bucket_size = bucket_size
+		self.epoch = 0
+		self._cache: tuple[int, list[list[int]]] | None = None
+
+	def set_epoch(
+		self,
+		epoch: int
+	) -> None:
+		self.epoch = epoch
+
+	def _batches(self) -> list[list[int]]:
+		if self._cache is not None and self._cache[0] == self.epoch:
+			return self._cache[1]
+
+		rng = np.random.default_rng((self.seed, self.epoch))
+		if self.shuffle:
+			order = rng.permutation(len(self.lengths))
+		else:
+			order = np.arange(len(self.lengths))
+
+		# a token budget packs the whole dataset in length order, so the number
+		# of batches only depends on the lengths and stays the same every epoch
+		bucket_size = len(order) if self.max_tokens is not None else self.bucket_size
+
+		batches: list[list[int]] = []
+		for start in range(0, len(order), max(bucket_size, 1)):
+			bucket = order[start:start + bucket_size]
+			bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+
+			batch: list[int] = []
+			longest = 0
+			for index in bucket.tolist():
+				length = int(self.lengths[index])
+				widest = max(longest, length)
+				full = (
+					(self.batch_size is not None and len(batch) >= self.batch_size)
+					or (self.max_tokens is not None and widest * (len(batch) + 1) > self.max_tokens)
+				)
+				if batch and full:
+					batches.append(batch)
+					batch = []
+					widest = length
+				batch.append(index)
+				longest = widest
+			if batch:
+				batches.append(batch)
+
+		if self.shuffle:
+			batches = [batches[i] for i in rng.permutation(len(batches))]
+
+		self._cache = (self.epoch, batches)
+		return batches
+
+	def __iter__(self) -> Iterator[list[int]]:
+		yield from self._batches()
+
+	def __len__(self) -> int:
+		return len(self._batches())
@@ -2,69 +2,144 @@ import os
 import subprocess
 import tempfile
 
+OUTFMT = "6 qseqid sseqid pident length score qlen slen"
 
-def blast_analysis(
-	pred: str,
-	target: str,
+
+def _empty_result(alignment: str = "") -> dict:
+	return {
+		"blast_identity": "",
+		"blast_score": "",
+		"cov_target": "",
+		"cov_pred": "",
+		"alignment": alignment
+	}
+
+
+def _write_fasta(
+	path: str,
+	records: list[tuple[int, str]],
+	prefix: str
+) -> None:
+	with open(path, "w") as f:
+		for index, sequence in records:
+			f.write(f">{prefix}{index}\n{sequence}\n")
+
+
+def _parse_hits(
+	output: str,
+	results: list[dict]
+) -> None:
+	for line in output.splitlines():
+		cols = line.split("\t")
+		if len(cols) < 7:
+			continue
+
+		index = int(cols[0][1:])
+		if cols[1] != f"t{index}" or results[index]["alignment"] != "No hit":
+			continue
+
+		aligned_len = int(cols[3])
+		qlen = int(cols[5])
+		slen = int(cols[6])
+
+		results[index] = {
+			"blast_identity": cols[2],
+			"blast_score": cols[4],
+			"cov_target": round(100.0 * aligned_len / slen, 2) if slen else 0.0,
+			"cov_pred": round(100.0 * aligned_len / qlen, 2) if qlen else 0.0,
+			"alignment": f"pred vs target len={aligned_len}"
+		}
+
+
+def blast_analysis_batch(
+	preds: list[str],
+	targets: list[str],
 	blastp_path: str = "blastp",
-	makeblast_path: str = "makeblastdb"
-) -> dict:
-	blast_identity = ""
-	blast_score = ""
-	cov_target = ""
-	cov_pred = ""
-	alignment = ""
-
-	if pred.strip() and target.strip():
-		with tempfile.TemporaryDirectory() as tmpdir:
-			target_fasta = os.path.join(tmpdir, "target.fasta")
-			pred_fasta = os.path.join(tmpdir, "pred.fasta")
-			db_name = os.path.join(tmpdir, "blastdb")
-
-			with open(target_fasta, "w") as tf:
-				tf.write(f">target\n{target}\n")
-			with open(pred_fasta, "w") as pf:
-				pf.write(f">pred\n{pred}\n")
-
-			subprocess.run(
-				[makeblast_path, "-in", target_fasta, "-dbtype", "prot", "-out", db_name],
-				check=True,
-				stdout=subprocess.DEVNULL,
-				stderr=subprocess.DEVNULL
-			)
+	makeblast_path: str = "makeblastdb",
+	num_shards: int = 1,
+	num_threads: int = 1,
+	evalue: float = 10.0,
+	max_target_seqs: int = 5
+) -> list[dict]:
+	if len(preds) != len(targets):
+		raise ValueError("preds and targets must have the same length.")
+
+	pairs = [
+		(index, pred.strip(), target.strip())
+		for index, (pred, target) in enumerate(zip(preds, targets))
+		if pred.strip() and target.strip()
+	]
+
+	results = [_empty_result() for _ in preds]
+	if not pairs:
+		return results
 
-			result = subprocess.run(
+	for index, _, _ in pairs:
+		results[index] = _empty_result("No hit")
+
+	num_shards = max(1, min(num_shards, len(pairs)))
+
+	# all targets share one database, which would inflate every e-value by the
+	# number of targets; fix the search space to a single average-sized target
+	db_size = max(1, round(sum(len(target) for _, _, target in pairs) / len(pairs)))
+
+	with tempfile.TemporaryDirectory() as tmpdir:
+		target_fasta = os.path.join(tmpdir, "target.fasta")
+		db_name = os.path.join(tmpdir, "blastdb")
+
+		_write_fasta(target_fasta, [(index, target) for index, _, target in pairs], "t")
+
+		subprocess.run(
+			[makeblast_path, "-in", target_fasta, "-dbtype", "prot", "-out", db_name],
+			check=True,
+			stdout=subprocess.DEVNULL,
+			stderr=subprocess.DEVNULL
+		)
+
+		processes = []
+		for shard in range(num_shards):
+			pred_fasta = os.path.join(tmpdir, f"pred_{shard}.fasta")
+			output_path = os.path.join(tmpdir, f"shard_{shard}.tsv")
+			_write_fasta(pred_fasta, [(index, pred) for index, pred, _ in pairs[shard::num_shards]], "p")
+
+			# each shard writes its own file, so no shard blocks on a full pipe
+			# while the others are read
+			processes.append((output_path, subprocess.Popen(
 				[
 					blastp_path,
 					"-query", pred_fasta,
 					"-db", db_name,
-					"-outfmt", "6 qseqid sseqid pident length score qlen slen"
+					"-out", output_path,
+					"-outfmt", OUTFMT,
+					"-evalue", str(evalue),
+					"-dbsize", str(db_size),
+					"-max_target_seqs", str(max_target_seqs),
+					"-num_threads", str(num_threads)
 				],
-				capture_output=True,
-				text=True
-			)
-
-			out = result.stdout.strip()
-			if out:
-				first_line = out.splitlines()[0]
-				cols = first_line.split("\t")
-
-				blast_identity = cols[2]
-				aligned_len = int(cols[3])
-				blast_score = cols[4]
-				qlen = int(cols[5])
-				slen = int(cols[6])
-
-				cov_target = round(100.0 * aligned_len / slen, 2) if slen else 0.0
-				cov_pred = round(100.0 * aligned_len / qlen, 2) if qlen else 0.0
-				alignment = f"{cols[0]} vs {cols[1]} len={aligned_len}"
-			else:
-				alignment = "No hit"
+				stdout=subprocess.DEVNULL,
+				stderr=subprocess.DEVNULL
+			)))
 
-	return {
-		"blast_identity": blast_identity,
-		"blast_score": blast_score,
-		"cov_target": cov_target,
-		"cov_pred": cov_pred,
-		"alignment": alignment
-	}
\ No newline at end of file
+		for output_path, process in processes:
+			if process.wait() != 0:
+				raise subprocess.CalledProcessError(process.returncode, process.args)
+
+		for output_path, _ in processes:
+			with open(output_path) as f:
+				_parse_hits(f.read(), results)
+
+	return results
+
+
+def blast_analysis(
+	pred: str,
+	target: str,
+	blastp_path: str = "blastp",
+	makeblast_path: str = "makeblastdb"
+) -> dict:
+	return blast_analysis_batch(
+		[pred],
+		[target],
+		blastp_path=blastp_path,
+		makeblast_path=makeblast_path
+	)[0]
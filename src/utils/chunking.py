@@ -0,0 +1,41 @@
+from typing import Literal
+
+import torch
+
+Pooling = Literal["mean", "max", "attention"]
+
+
+def window_spans(
+	length: int,
+	window: int,
+	overlap: int = 0
+) -> list[tuple[int, int]]:
+	if window < 1:
+		raise ValueError("window must be at least 1.")
+	if not 0 <= overlap < window:
+		raise ValueError("overlap must be in [0, window).")
+
+	if length <= window:
+		return [(0, length)]
+
+	step = window - overlap
+	starts = list(range(0, length - window, step)) + [length - window]
+
+	return [(start, start + window) for start in starts]
+
+
+def pool_logits(
+	logits: torch.Tensor,
+	pooling: Pooling = "mean"
+) -> torch.Tensor:
+	log_probs = torch.log_softmax(logits, dim=-1)
+
+	if pooling == "mean":
+		return log_probs.mean(dim=0)
+	if pooling == "max":
+		return log_probs.max(dim=0).values
+	if pooling == "attention":
+		weights = torch.softmax(log_probs.max(dim=-1).values, dim=0)
+		return (weights[:, None] * log_probs).sum(dim=0)
+
+	raise ValueError(f"Unknown pooling '{pooling}'.")
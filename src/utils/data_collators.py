@@ -12,11 +12,11 @@ class DataCollatorForFT(DataCollatorWithPadding):
 		batch = super().__call__(features_no_labels)
 
 		if labels is not None:
-			labels_tensors = [torch.tensor(l, dtype=torch.long) for l in labels]
-			batch["labels"] = torch.nn.utils.rnn.pad_sequence(
-				labels_tensors,
-				batch_first=True,
-				padding_value=-100
-			)
+			width = batch["input_ids"].shape[1]
+			left = self.tokenizer.padding_side == "left"
+			batch["labels"] = torch.tensor([
+				[-100] * (width - len(l)) + list(l) if left else list(l) + [-100] * (width - len(l))
+				for l in labels
+			], dtype=torch.long)
 		
-		return batch
\ No newline at end of file
+		return batch
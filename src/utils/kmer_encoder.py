@@ -0,0 +1,73 @@
+from itertools import product
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from transformers import PreTrainedTokenizerBase
+
+INVALID_BASE = 4
+
+BASE_CODES = np.full(256, INVALID_BASE, dtype=np.uint8)
+for code, base in enumerate("ACGT"):
+	BASE_CODES[ord(base)] = code
+	BASE_CODES[ord(base.lower())] = code
+
+
+class KmerEncoder:
+	def __init__(
+		self,
+		tokenizer: PreTrainedTokenizerBase,
+		k: int = 6,
+		stride: int | None = None
+	) -> None:
+		if stride is None:
+			stride = k
+		if stride not in (1, k):
+			raise ValueError(f"stride must be 1 (overlapping) or {k} (non-overlapping).")
+
+		self.tokenizer = tokenizer
+		self.k = k
+		self.stride = stride
+
+		vocab = tokenizer.get_vocab()
+		unk_id = tokenizer.unk_token_id
+		if unk_id is None:
+			raise ValueError("Tokenizer must define an unknown token.")
+		self.unk_id = unk_id
+
+		self.kmer_ids = np.array(
+			[vocab.get("".join(kmer), unk_id) for kmer in product("ACGT", repeat=k)],
+			dtype=np.int64
+		)
+		self._weights = 4 ** np.arange(k - 1, -1, -1, dtype=np.int64)
+
+	def encode_sequence(
+		self,
+		sequence: str
+	) -> np.ndarray:
+		codes = BASE_CODES[np.frombuffer(sequence.encode("ascii", errors="replace"), dtype=np.uint8)]
+
+		if self.stride == self.k:
+			remain = len(codes) % self.k
+			if remain:
+				codes = np.concatenate([codes, np.full(self.k - remain, INVALID_BASE, dtype=np.uint8)])
+
+		if len(codes) < self.k:
+			return np.empty(0, dtype=np.int64)
+
+		windows = sliding_window_view(codes, self.k)[::self.stride]
+		ids = self.kmer_ids[(windows.astype(np.int64) & 3) @ self._weights]
+		ids[(windows == INVALID_BASE).any(axis=1)] = self.unk_id
+
+		return ids
+
+	def encode(
+		self,
+		sequence: str,
+		max_length: int | None = None
+	) -> list[int]:
+		ids = self.encode_sequence(sequence)
+
+		if max_length is not None:
+			ids = ids[:max(0, max_length - self.tokenizer.num_special_tokens_to_add())]
+
+		return self.tokenizer.build_inputs_with_special_tokens(ids.tolist())
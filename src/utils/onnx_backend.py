@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+import torch
+from transformers import PretrainedConfig, PreTrainedModel
+
+ONNX_FILE_NAME = "model.onnx"
+
+
+@dataclass
+class OnnxOutput:
+	logits: torch.Tensor
+
+
+class _LogitsModule(torch.nn.Module):
+	def __init__(
+		self,
+		model: PreTrainedModel,
+		input_names: Sequence[str]
+	) -> None:
+		super().__init__()
+		self.model = model
+		self.input_names = list(input_names)
+
+	def forward(
+		self,
+		*inputs: torch.Tensor
+	) -> torch.Tensor:
+		return self.model(**dict(zip(self.input_names, inputs)), return_dict=True).logits
+
+
+def export_onnx(
+	model: PreTrainedModel,
+	output_path: str | Path,
+	input_names: Sequence[str],
+	opset_version: int = 17
+) -> Path:
+	path = Path(output_path) / ONNX_FILE_NAME
+	device = model.device
+	module = _LogitsModule(model.to("cpu"), input_names).eval()
+
+	dummy = torch.ones((2, 8), dtype=torch.long)
+	dummy_inputs = tuple(
+		torch.arange(8).expand(2, 8).contiguous() if name == "position_ids" else dummy
+		for name in input_names
+	)
+
+	dynamic_axes: dict[str, dict[int, str]] = {
+		name: {0: "batch", 1: "sequence"} for name in input_names
+	}
+
+	with torch.no_grad():
+		logits = module(*dummy_inputs)
+		dynamic_axes["logits"] = {0: "batch", 1: "sequence"} if logits.dim() == 3 else {0: "batch"}
+
+		torch.onnx.export(
+			module,
+			dummy_inputs,
+			str(path),
+			input_names=list(input_names),
+			output_names=["logits"],
+			dynamic_axes=dynamic_axes,
+			opset_version=opset_version,
+			dynamo=False
+		)
+
+	model.to(device)
+
+	return path
+
+
+class OnnxRuntimeModel:
+	def __init__(
+		self,
+		path: str | Path,
+		config: PretrainedConfig,
+		num_threads: int | None = None
+	) -> None:
+		import onnxruntime as ort
+
+		options = ort.SessionOptions()
+		options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+		if num_threads:
+			options.intra_op_num_threads = num_threads
+
+		path = Path(path)
+		if path.is_dir():
+			path = path / ONNX_FILE_NAME
+
+		self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+		self.input_names = [node.name for node in self.session.get_inputs()]
+		self.config = config
+		self.device = torch.device("cpu")
+
+	def eval(self) -> "OnnxRuntimeModel":
+		return self
+
+	def __call__(
+		self,
+		**inputs: Any
+	) -> OnnxOutput:
+		feeds = {
+			name: inputs[name].detach().cpu().numpy().astype(np.int64)
+			for name in self.input_names
+		}
+		logits = self.session.run(["logits"], feeds)[0]
+
+		return OnnxOutput(logits=torch.from_numpy(logits))
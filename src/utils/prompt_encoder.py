@@ -0,0 +1,70 @@
+from typing import Sequence
+
+import numpy as np
+from transformers import PreTrainedTokenizerBase
+
+IUPAC_NUCLEOTIDES = "ACGTRYSWKMBDHVN"
+
+
+class PromptEncoder:
+	def __init__(
+		self,
+		tokenizer: PreTrainedTokenizerBase,
+		symbols: dict[str, str],
+		fallback_token: str | None = None
+	) -> None:
+		self.tokenizer = tokenizer
+		self._text_cache: dict[str, np.ndarray] = {}
+
+		vocab = tokenizer.get_vocab()
+
+		self.lookup = np.full(256, -1, dtype=np.int64)
+		for symbol, token in symbols.items():
+			if token not in vocab:
+				raise ValueError(f"Token '{token}' is not part of the tokenizer vocabulary.")
+			self.lookup[ord(symbol.upper())] = vocab[token]
+			self.lookup[ord(symbol.lower())] = vocab[token]
+
+		if fallback_token is not None:
+			if fallback_token not in vocab:
+				raise ValueError(f"Token '{fallback_token}' is not part of the tokenizer vocabulary.")
+			self.lookup[self.lookup < 0] = vocab[fallback_token]
+
+	def encode_sequence(
+		self,
+		sequence: str
+	) -> np.ndarray:
+		codes = np.frombuffer(sequence.encode("ascii", errors="replace"), dtype=np.uint8)
+		return self.encode_codes(codes)
+
+	def encode_codes(
+		self,
+		codes: np.ndarray
+	) -> np.ndarray:
+		ids = self.lookup[codes]
+		return ids[ids >= 0]
+
+	def encode_text(
+		self,
+		text: str
+	) -> np.ndarray:
+		ids = self._text_cache.get(text)
+		if ids is None:
+			ids = np.asarray(
+				self.tokenizer.encode(text, add_special_tokens=False),
+				dtype=np.int64
+			)
+			self._text_cache[text] = ids
+		return ids
+
+	def encode(
+		self,
+		parts: Sequence[np.ndarray],
+		max_length: int | None = None
+	) -> list[int]:
+		ids = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+		if max_length is not None:
+			ids = ids[:max(0, max_length - self.tokenizer.num_special_tokens_to_add())]
+
+		return self.tokenizer.build_inputs_with_special_tokens(ids.tolist())
@@ -0,0 +1,45 @@
+from pathlib import Path
+from typing import Any
+
+import torch
+from transformers import AutoConfig, PreTrainedModel
+
+QUANTIZED_WEIGHTS_NAME = "quantized_model.pt"
+
+
+def quantize_dynamic(model: PreTrainedModel) -> PreTrainedModel:
+	return torch.ao.quantization.quantize_dynamic(
+		model.to("cpu").eval(),
+		{torch.nn.Linear},
+		dtype=torch.qint8
+	)
+
+
+def is_quantized_checkpoint(checkpoint: str | Path) -> bool:
+	return (Path(checkpoint) / QUANTIZED_WEIGHTS_NAME).exists()
+
+
+def save_quantized(
+	model: PreTrainedModel,
+	output_path: str | Path
+) -> None:
+	Path(output_path).mkdir(parents=True, exist_ok=True)
+	model.config.save_pretrained(output_path)
+	torch.save(model.state_dict(), Path(output_path) / QUANTIZED_WEIGHTS_NAME)
+
+
+def load_quantized(
+	model_class: Any,
+	checkpoint: str | Path
+) -> PreTrainedModel:
+	config = AutoConfig.from_pretrained(checkpoint)
+
+	from_config = getattr(model_class, "from_config", None) or model_class._from_config
+	model = quantize_dynamic(from_config(config))
+	model.load_state_dict(torch.load(
+		Path(checkpoint) / QUANTIZED_WEIGHTS_NAME,
+		map_location="cpu",
+		weights_only=True
+	))
+
+	return model
@@ -0,0 +1,115 @@
+import inspect
+import io
+import time
+from pathlib import Path
+from typing import Any, TypedDict
+
+import numpy as np
+import pandas as pd
+import torch
+
+from utils.batching import length_sorted_batches
+
+COLUMN_ALIASES = {
+	"flankBefore": "before",
+	"flankAfter": "after"
+}
+
+
+class QuantizationReport(TypedDict):
+	variant: str
+	accuracy: float
+	size_mb: float
+	samples_per_second: float
+	latency_p50_ms: float
+	latency_p95_ms: float
+
+
+def _model_size_mb(model: Any) -> float:
+	buffer = io.BytesIO()
+	torch.save(model.state_dict(), buffer)
+	return buffer.tell() / 2**20
+
+
+def _accuracy(
+	predictions: list[str],
+	targets: list[str],
+	per_position: bool
+) -> float:
+	if per_position:
+		scores = [
+			np.mean([p == t for p, t in zip(pred, target)]) if target else 0.0
+			for pred, target in zip(predictions, targets)
+		]
+	else:
+		scores = [pred == target for pred, target in zip(predictions, targets)]
+
+	return float(np.mean(scores)) if scores else 0.0
+
+
+def _build_input(
+	model: Any,
+	row: dict[str, Any]
+) -> Any:
+	parameters = inspect.signature(model.build_input).parameters
+
+	kwargs: dict[str, Any] = {"target": None} if "target" in parameters else {}
+	for column, value in row.items():
+		key = COLUMN_ALIASES.get(column, column)
+		if key in parameters and key != "target":
+			kwargs[key] = value or None
+	if "hide_prob" in parameters:
+		kwargs["hide_prob"] = 0.0
+
+	return model.build_input(**kwargs)
+
+
+def compare_quantized(
+	model_class: Any,
+	checkpoint: str | Path,
+	csv_path: str | Path,
+	target_column: str = "target",
+	batch_size: int = 16,
+	limit: int | None = None,
+	per_position: bool = False,
+	num_threads: int | None = None
+) -> list[QuantizationReport]:
+	if num_threads:
+		torch.set_num_threads(num_threads)
+
+	df = pd.read_csv(csv_path, keep_default_na=False)
+	if limit is not None:
+		df = df.head(limit)
+
+	reports: list[QuantizationReport] = []
+	for variant, quantize in (("float32", False), ("int8", True)):
+		model = model_class()
+		model.from_pretrained(str(checkpoint), quantize=quantize)
+		model.model.to("cpu")
+
+		inputs = [_build_input(model, row) for row in df.to_dict("records")]
+
+		lengths = [len(data["sequence"]) for data in inputs]
+		predictions: list[str] = [""] * len(inputs)
+		latencies = []
+		start = time.perf_counter()
+		for batch in length_sorted_batches(lengths, batch_size):
+			batch_start = time.perf_counter()
+			outputs = model.generate_batch([inputs[i] for i in batch], batch_size=batch_size)
+			latencies.append((time.perf_counter() - batch_start) * 1000)
+			for i, output in zip(batch, outputs):
+				predictions[i] = output
+		elapsed = time.perf_counter() - start
+
+		reports.append({
+			"variant": variant,
+			"accuracy": _accuracy(predictions, df[target_column].astype(str).tolist(), per_position),
+			"size_mb": _model_size_mb(model.model),
+			"samples_per_second": len(inputs) / elapsed if elapsed else 0.0,
+			"latency_p50_ms": float(np.percentile(latencies, 50)) if latencies else 0.0,
+			"latency_p95_ms": float(np.percentile(latencies, 95)) if latencies else 0.0
+		})
+
+		model.unload_model()
+
+	return reports
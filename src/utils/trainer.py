@@ -0,0 +1,60 @@
+from functools import partial
+
+from datasets import Dataset
+from torch.utils.data import DataLoader
+from transformers.trainer import Trainer
+from transformers.trainer_utils import seed_worker
+
+from utils.batching import LengthGroupedBatchSampler
+
+
+class LengthGroupedTrainer(Trainer):
+	def __init__(
+		self,
+		*args,
+		max_tokens: int | None = None,
+		group_by_length: bool = True,
+		**kwargs
+	) -> None:
+		super().__init__(*args, **kwargs)
+		self.max_tokens = max_tokens
+		self.group_by_length = group_by_length
+
+	def _train_lengths(
+		self,
+		dataset: Dataset
+	) -> list[int]:
+		if "length" in dataset.column_names:
+			return dataset["length"]
+		return [len(ids) for ids in dataset["input_ids"]]
+
+	def get_train_dataloader(self) -> DataLoader:
+		dataset = self.train_dataset
+		if (
+			not isinstance(dataset, Dataset)
+			or (self.max_tokens is None and not self.group_by_length)
+		):
+			return super().get_train_dataloader()
+
+		batch_sampler = LengthGroupedBatchSampler(
+			self._train_lengths(dataset),
+			batch_size=None if self.max_tokens else self._train_batch_size,
+			max_tokens=self.max_tokens,
+			seed=self.args.seed
+		)
+
+		dataloader = DataLoader(
+			self._remove_unused_columns(dataset, description="Training"),
+			batch_sampler=batch_sampler,
+			collate_fn=self.data_collator,
+			num_workers=self.args.dataloader_num_workers,
+			pin_memory=self.args.dataloader_pin_memory,
+			persistent_workers=self.args.dataloader_persistent_workers,
+			worker_init_fn=partial(
+				seed_worker,
+				num_workers=self.args.dataloader_num_workers,
+				rank=self.args.process_index
+			)
+		)
+
+		return self.accelerator.prepare(dataloader)
@@ -0,0 +1,118 @@
+import random
+
+import pytest
+from Bio import Align
+from Bio.Align import substitution_matrices
+
+from utils.alignment import alignment_analysis, smith_waterman_batch
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def _aligner(
+	gap_open: int,
+	gap_extend: int
+) -> Align.PairwiseAligner:
+	return Align.PairwiseAligner(
+		mode="local",
+		substitution_matrix=substitution_matrices.load("BLOSUM62"),
+		open_gap_score=-(gap_open + gap_extend),
+		extend_gap_score=-gap_extend
+	)
+
+
+def _mutate(
+	rng: random.Random,
+	sequence: str
+) -> str:
+	output = []
+	for residue in sequence:
+		roll = rng.random()
+		if roll < 0.1:
+			continue
+		if roll < 0.2:
+			output.append(rng.choice(AMINO_ACIDS))
+		elif roll < 0.25:
+			output += [residue, rng.choice(AMINO_ACIDS)]
+		else:
+			output.append(residue)
+
+	return "".join(output)
+
+
+@pytest.fixture(scope="module")
+def pairs() -> tuple[list[str], list[str]]:
+	rng = random.Random(0)
+	preds, targets = [], []
+	for _ in range(60):
+		target = "".join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(1, 150)))
+		targets.append(target)
+		if rng.random() < 0.8:
+			preds.append(_mutate(rng, target) or "A")
+		else:
+			preds.append("".join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(1, 100))))
+
+	return preds, targets
+
+
+@pytest.mark.parametrize("gap_open, gap_extend", [(11, 1), (10, 2), (0, 4)])
+def test_scores_match_biopython(
+	pairs: tuple[list[str], list[str]],
+	gap_open: int,
+	gap_extend: int
+) -> None:
+	preds, targets = pairs
+	aligner = _aligner(gap_open, gap_extend)
+
+	scores, _, _ = smith_waterman_batch(preds, targets, gap_open, gap_extend)
+
+	assert scores.tolist() == [aligner.score(pred, target) for pred, target in zip(preds, targets)]
+
+
+def test_identities_and_lengths_of_unambiguous_alignments() -> None:
+	preds = ["MKTAYIAKQR", "MKTAYIAKQR", "WWMKTAYWW", "MKTAYIAKQRQISFVKSHFSRQ"]
+	targets = ["MKTAYIAKQR", "MKTAHIAKQR", "MKTAY", "MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQ"]
+	aligner = _aligner(11, 1)
+
+	_, matches, lengths = smith_waterman_batch(preds, targets)
+
+	for pred, target, identities, length in zip(preds, targets, matches, lengths):
+		counts = aligner.align(pred, target)[0].counts()
+		assert identities == counts.identities
+		assert length == counts.identities + counts.mismatches + counts.gaps
+
+
+def test_no_positive_score() -> None:
+	scores, matches, lengths = smith_waterman_batch(["W"], ["P"])
+
+	assert scores.tolist() == [0]
+	assert matches.tolist() == [0]
+	assert lengths.tolist() == [0]
+
+
+def test_alignment_analysis(pairs: tuple[list[str], list[str]]) -> None:
+	preds, targets = pairs
+	preds = preds[:10] + ["", "W"]
+	targets = targets[:10] + ["MKT", "P"]
+
+	results = alignment_analysis(preds, targets, batch_size=4, num_workers=1)
+
+	assert results == alignment_analysis(preds, targets, batch_size=3, num_workers=2)
+	assert results[10] == {
+		"blast_identity": "",
+		"blast_score": "",
+		"cov_target": "",
+		"cov_pred": "",
+		"alignment": ""
+	}
+	assert results[11]["alignment"] == "No hit"
+
+	aligner = _aligner(11, 1)
+	for pred, target, result in zip(preds[:10], targets[:10], results):
+		if result["alignment"] != "No hit":
+			assert int(result["blast_score"]) == aligner.score(pred, target)
+
+
+def test_alignment_analysis_mismatched_lengths() -> None:
+	with pytest.raises(ValueError):
+		alignment_analysis(["A"], [])
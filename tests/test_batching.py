@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from utils.batching import LengthGroupedBatchSampler, length_sorted_batches
+
+
+@pytest.fixture
+def lengths() -> list[int]:
+	return np.random.default_rng(0).integers(1, 500, size=3000).tolist()
+
+
+def _flatten(batches: list[list[int]]) -> list[int]:
+	return sorted(index for batch in batches for index in batch)
+
+
+def test_length_sorted_batches() -> None:
+	batches = list(length_sorted_batches([5, 1, 4, 2, 3], 2))
+
+	assert batches == [[1, 3], [4, 2], [0]]
+
+
+def test_every_index_once_per_epoch(lengths: list[int]) -> None:
+	sampler = LengthGroupedBatchSampler(lengths, batch_size=32, seed=1)
+
+	for epoch in range(3):
+		sampler.set_epoch(epoch)
+		batches = list(sampler)
+		assert _flatten(batches) == list(range(len(lengths)))
+		assert all(len(batch) <= 32 for batch in batches)
+
+
+def test_token_budget(lengths: list[int]) -> None:
+	sampler = LengthGroupedBatchSampler(lengths, max_tokens=4096, seed=1)
+
+	batches = list(sampler)
+	assert _flatten(batches) == list(range(len(lengths)))
+	for batch in batches:
+		assert max(lengths[i] for i in batch) * len(batch) <= 4096
+
+
+def test_oversized_example_gets_its_own_batch() -> None:
+	sampler = LengthGroupedBatchSampler([10, 5000, 10], max_tokens=100, shuffle=False)
+
+	assert [5000] in [[[10, 5000, 10][i] for i in batch] for batch in sampler]
+
+
+@pytest.mark.parametrize("options", [{"batch_size": 16}, {"max_tokens": 2048}])
+def test_batch_count_is_fixed_across_epochs(
+	lengths: list[int],
+	options: dict
+) -> None:
+	sampler = LengthGroupedBatchSampler(lengths, seed=3, **options)
+
+	counts = set()
+	for epoch in range(5):
+		sampler.set_epoch(epoch)
+		counts.add(len(sampler))
+		assert len(list(sampler)) == len(sampler)
+
+	assert len(counts) == 1
+
+
+def test_epoch_is_only_advanced_by_set_epoch(lengths: list[int]) -> None:
+	sampler = LengthGroupedBatchSampler(lengths, batch_size=16, seed=3)
+
+	first = list(sampler)
+	assert list(sampler) == first
+
+	sampler.set_epoch(1)
+	second = list(sampler)
+	assert second != first
+
+	sampler.set_epoch(0)
+	assert list(sampler) == first
+
+
+def test_requires_batch_size_or_max_tokens() -> None:
+	with pytest.raises(ValueError):
+		LengthGroupedBatchSampler([1, 2, 3])
@@ -0,0 +1,141 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from utils.blast_analysis import _empty_result, _parse_hits, blast_analysis_batch
+
+MAKEBLASTDB = """
+import shutil, sys
+args = sys.argv
+shutil.copy(args[args.index("-in") + 1], args[args.index("-out") + 1] + ".fasta")
+"""
+
+# reports the best-scoring query/subject pairs with at least half identical
+# residues, the off-diagonal hits first on ties, so the parser has to pick the
+# right one
+BLASTP = """
+import os, sys
+args = sys.argv
+if "BLAST_STUB_LOG" in os.environ:
+	with open(os.environ["BLAST_STUB_LOG"], "a") as f:
+		f.write(" ".join(args[1:]) + "\\n")
+
+def read(path):
+	records, name = {}, None
+	for line in open(path):
+		line = line.strip()
+		if line.startswith(">"):
+			name = line[1:]
+			records[name] = ""
+		elif name:
+			records[name] += line
+	return records
+
+queries = read(args[args.index("-query") + 1])
+subjects = read(args[args.index("-db") + 1] + ".fasta")
+with open(args[args.index("-out") + 1], "w") as out:
+	for query, query_sequence in queries.items():
+		hits = []
+		for subject, subject_sequence in sorted(subjects.items(), key=lambda item: item[0] == "t" + query[1:]):
+			length = min(len(query_sequence), len(subject_sequence))
+			matches = sum(a == b for a, b in zip(query_sequence, subject_sequence))
+			if 2 * matches < length:
+				continue
+			hits.append((5 * matches, f"{query}\\t{subject}\\t{100 * matches / length:.2f}\\t{length}\\t{5 * matches}\\t{len(query_sequence)}\\t{len(subject_sequence)}"))
+		hits.sort(key=lambda hit: -hit[0])
+		for _, line in hits[:int(args[args.index("-max_target_seqs") + 1])]:
+			out.write(line + "\\n")
+"""
+
+
+@pytest.fixture
+def blast_stubs(tmp_path: Path) -> tuple[str, str]:
+	paths = []
+	for name, source in (("blastp", BLASTP), ("makeblastdb", MAKEBLASTDB)):
+		path = tmp_path / name
+		path.write_text(f"#!{sys.executable}\n{source}")
+		path.chmod(0o755)
+		paths.append(str(path))
+
+	return paths[0], paths[1]
+
+
+def test_parse_hits_keeps_only_the_paired_target() -> None:
+	results = [_empty_result("No hit") for _ in range(3)]
+	output = "\n".join([
+		"p0\tt1\t90.00\t10\t50\t10\t10",
+		"p0\tt0\t80.00\t8\t40\t10\t16",
+		"p0\tt0\t99.00\t4\t20\t10\t16",
+		"p1\tt2\t100.00\t5\t25\t5\t5",
+		"p2\tt2\t50.00\t4\t10\t8\t4",
+		"malformed line"
+	])
+
+	_parse_hits(output, results)
+
+	assert results[0] == {
+		"blast_identity": "80.00",
+		"blast_score": "40",
+		"cov_target": 50.0,
+		"cov_pred": 80.0,
+		"alignment": "pred vs target len=8"
+	}
+	assert results[1] == _empty_result("No hit")
+	assert results[2]["blast_score"] == "10"
+
+
+@pytest.mark.parametrize("num_shards", [1, 2, 5])
+def test_batch_pairs_predictions_with_their_targets(
+	blast_stubs: tuple[str, str],
+	num_shards: int
+) -> None:
+	blastp, makeblastdb = blast_stubs
+	preds = ["MKTAYIAK", "", "MKTAYIAK", "WWWWWW", "ACDEFG"]
+	targets = ["MKTAYIAK", "MKT", "MKTAYLLK", "MKTAYIAK", "ACDEFGHIKL"]
+
+	results = blast_analysis_batch(preds, targets, blastp, makeblastdb, num_shards=num_shards)
+
+	assert [result["blast_identity"] for result in results] == ["100.00", "", "75.00", "", "100.00"]
+	assert results[1] == _empty_result()
+	assert results[3] == _empty_result("No hit")
+	assert results[4]["cov_target"] == 60.0
+	assert results[4]["cov_pred"] == 100.0
+
+
+def test_batch_fixes_the_search_space(
+	blast_stubs: tuple[str, str],
+	tmp_path: Path,
+	monkeypatch: pytest.MonkeyPatch
+) -> None:
+	log = tmp_path / "blastp.log"
+	monkeypatch.setenv("BLAST_STUB_LOG", str(log))
+	blastp, makeblastdb = blast_stubs
+
+	blast_analysis_batch(["MKT", "ACDE"], ["MKTA", "ACDEFGHI"], blastp, makeblastdb)
+
+	(call,) = [line.split() for line in log.read_text().splitlines()]
+	assert call[call.index("-dbsize") + 1] == "6"
+
+
+def test_batch_caps_hits_and_writes_one_file_per_shard(
+	blast_stubs: tuple[str, str],
+	tmp_path: Path,
+	monkeypatch: pytest.MonkeyPatch
+) -> None:
+	log = tmp_path / "blastp.log"
+	monkeypatch.setenv("BLAST_STUB_LOG", str(log))
+	blastp, makeblastdb = blast_stubs
+	targets = ["MKTAYIAK", "MKTAYIAW", "MKTAYIWW", "MKTAYWWW", "MKTAWWWW", "MKTWWWWW"]
+
+	results = blast_analysis_batch(targets, targets, blastp, makeblastdb, num_shards=3, max_target_seqs=1)
+
+	calls = [line.split() for line in log.read_text().splitlines()]
+	assert len({call[call.index("-out") + 1] for call in calls}) == 3
+	assert all(call[call.index("-max_target_seqs") + 1] == "1" for call in calls)
+	assert [result["blast_identity"] for result in results] == ["100.00"] * 6
+
+
+def test_mismatched_lengths() -> None:
+	with pytest.raises(ValueError):
+		blast_analysis_batch(["A"], [])
@@ -0,0 +1,71 @@
+import pytest
+import torch
+
+from utils.chunking import pool_logits, window_spans
+
+
+def test_short_sequence_is_one_window() -> None:
+	assert window_spans(0, 8) == [(0, 0)]
+	assert window_spans(8, 8) == [(0, 8)]
+
+
+@pytest.mark.parametrize("length", [9, 17, 100, 513, 1000])
+@pytest.mark.parametrize("window, overlap", [(8, 0), (8, 3), (128, 64), (512, 511)])
+def test_windows_cover_sequence(
+	length: int,
+	window: int,
+	overlap: int
+) -> None:
+	spans = window_spans(length, window, overlap)
+
+	assert spans[0][0] == 0
+	assert spans[-1][1] == length
+	assert all(end - start == min(window, length) for start, end in spans)
+	for (start, end), (next_start, _) in zip(spans, spans[1:]):
+		assert start < next_start
+		assert end - next_start >= min(overlap, end - start)
+
+
+def test_last_window_is_aligned_to_the_end() -> None:
+	assert window_spans(20, 8, 2) == [(0, 8), (6, 14), (12, 20)]
+	assert window_spans(10, 8) == [(0, 8), (2, 10)]
+
+
+@pytest.mark.parametrize("window, overlap", [(0, 0), (8, 8), (8, -1)])
+def test_invalid_arguments(
+	window: int,
+	overlap: int
+) -> None:
+	with pytest.raises(ValueError):
+		window_spans(100, window, overlap)
+
+
+@pytest.fixture
+def logits() -> torch.Tensor:
+	return torch.tensor([[2.0, 0.0], [0.0, 1.0], [4.0, -1.0]])
+
+
+def test_mean_and_max_pooling(logits: torch.Tensor) -> None:
+	log_probs = torch.log_softmax(logits, dim=-1)
+
+	torch.testing.assert_close(pool_logits(logits, "mean"), log_probs.mean(dim=0))
+	torch.testing.assert_close(pool_logits(logits, "max"), log_probs.max(dim=0).values)
+
+
+def test_attention_pooling_favours_confident_windows(logits: torch.Tensor) -> None:
+	pooled = pool_logits(logits, "attention")
+	log_probs = torch.log_softmax(logits, dim=-1)
+
+	assert pooled.shape == (2,)
+	assert pooled.argmax() == 0
+	assert pooled[0] > log_probs[:, 0].mean()
+
+
+def test_single_window_is_its_log_softmax(logits: torch.Tensor) -> None:
+	for pooling in ("mean", "max", "attention"):
+		torch.testing.assert_close(pool_logits(logits[:1], pooling), torch.log_softmax(logits[0], dim=-1))
+
+
+def test_unknown_pooling(logits: torch.Tensor) -> None:
+	with pytest.raises(ValueError):
+		pool_logits(logits, "median")
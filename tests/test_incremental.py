@@ -0,0 +1,138 @@
+import random
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqFeature import FeatureLocation, SeqFeature
+from Bio.SeqRecord import SeqRecord
+
+from data_processor.dedup import SequenceDeduplicator
+from data_processor.genbank_index import GenBankIndex
+from data_processor.incremental import build_dataset, refresh_dataset
+from data_processor.manifest import ExtractionManifest
+from data_processor.parquet_writer import SCHEMAS
+from data_processor.sequence_store import SequenceStore
+
+
+def _record(
+	rng: random.Random,
+	accession: str,
+	sequence: str | None = None
+) -> SeqRecord:
+	sequence = sequence or "".join(rng.choice("ACGTN") for _ in range(rng.randint(100, 400)))
+	record = SeqRecord(Seq(sequence), id=f"{accession}.1", name=accession, description="synthetic")
+	record.annotations["molecule_type"] = "DNA"
+	record.annotations["organism"] = "Homo sapiens"
+
+	start = rng.randint(0, 40)
+	end = rng.randint(start + 50, len(sequence))
+	record.features = [
+		SeqFeature(FeatureLocation(start, end, strand=1), type="CDS", qualifiers={"gene": ["g0"], "translation": ["MKV"]}),
+		SeqFeature(FeatureLocation(start, start + 20, strand=1), type="exon", qualifiers={"gene": ["g0"]}),
+		SeqFeature(FeatureLocation(start + 20, end, strand=1), type="intron", qualifiers={"gene": ["g0"]})
+	]
+	return record
+
+
+def _write(
+	path: Path,
+	records: list[SeqRecord]
+) -> str:
+	SeqIO.write(records, path, "genbank")
+	return str(path)
+
+
+def _read(
+	output_dir: Path,
+	name: str
+) -> list[dict]:
+	frame = pd.read_parquet(output_dir / name)
+	for column in frame.columns:
+		if isinstance(frame[column].dtype, pd.CategoricalDtype):
+			frame[column] = frame[column].astype(object)
+
+	return sorted(frame.to_dict("records"), key=lambda row: tuple(map(str, row.values())))
+
+
+@pytest.fixture
+def versions(tmp_path: Path) -> tuple[str, str]:
+	rng = random.Random(0)
+	shared = "ACGT" * 30
+	records = [_record(rng, f"AB{i:04d}") for i in range(12)]
+	# AB0100 owns the shared sequence, AB0101 and AB0102 are its duplicates
+	records += [_record(rng, f"AB{i:04d}", shared) for i in (100, 101, 102)]
+	first = _write(tmp_path / "v1.gb", records)
+
+	updated = [record for record in records if record.name not in ("AB0003", "AB0100")]
+	updated[0] = _record(rng, "AB0000")
+	updated.append(_record(rng, "AB0200"))
+	second = _write(tmp_path / "v2.gb", updated)
+
+	return first, second
+
+
+def test_manifest_diff(
+	tmp_path: Path,
+	versions: tuple[str, str]
+) -> None:
+	first, second = versions
+	first_index = GenBankIndex.build(first)
+	manifest = ExtractionManifest(tmp_path / "manifest.parquet")
+
+	assert manifest.diff(first_index) == (first_index.accessions, [])
+
+	for accession, digest in zip(first_index.accessions, first_index.digests):
+		manifest.update(accession, digest, 0)
+	manifest.save()
+	manifest = ExtractionManifest(tmp_path / "manifest.parquet")
+
+	assert manifest.diff(first_index) == ([], [])
+	assert manifest.diff(GenBankIndex.build(second)) == (["AB0000.1", "AB0200.1"], ["AB0003.1", "AB0100.1"])
+
+
+def test_remove_accessions_promotes_duplicates() -> None:
+	with SequenceDeduplicator() as dedup:
+		assert dedup.add("A", "ACGT", "Homo sapiens")
+		assert not dedup.add("C", "ACGT", "Homo sapiens")
+		assert not dedup.add("B", "ACGT", "Homo sapiens")
+		assert dedup.add("D", "ACGT", "Mus musculus")
+
+		assert dedup.remove_accessions(["A"]) == ["B"]
+		assert dedup.add("B", "ACGT", "Homo sapiens")
+		assert not dedup.add("C", "ACGT", "Homo sapiens")
+		assert dedup.duplicate_counts() == {"Homo sapiens": 1}
+
+		assert dedup.remove_accessions(["B", "C", "D"]) == []
+		assert len(dedup) == 0
+		assert dedup.duplicate_counts() == {}
+
+
+def test_refresh_matches_fresh_build(
+	tmp_path: Path,
+	versions: tuple[str, str]
+) -> None:
+	first, second = versions
+	refreshed, fresh = tmp_path / "refreshed", tmp_path / "fresh"
+
+	assert build_dataset(first, str(refreshed), records_per_partition=4) == {"Homo sapiens": 2}
+	assert refresh_dataset(first, str(refreshed)) == ([], [])
+
+	changed, removed = refresh_dataset(second, str(refreshed), records_per_partition=4)
+	assert (changed, removed) == (["AB0000.1", "AB0200.1"], ["AB0003.1", "AB0100.1"])
+
+	duplicate_counts = build_dataset(second, str(fresh), records_per_partition=4)
+	with SequenceDeduplicator(refreshed / "dedup.sqlite") as dedup:
+		assert dedup.duplicate_counts() == duplicate_counts == {"Homo sapiens": 1}
+
+	for name in SCHEMAS:
+		assert _read(refreshed, name) == _read(fresh, name)
+
+	refreshed_store, fresh_store = SequenceStore(refreshed / "sequences"), SequenceStore(fresh / "sequences")
+	assert sorted(refreshed_store.accessions) == sorted(fresh_store.accessions)
+	assert "AB0101.1" in refreshed_store
+	for accession in fresh_store.accessions:
+		assert refreshed_store.fetch(accession) == fresh_store.fetch(accession)
+
+	assert refresh_dataset(second, str(refreshed)) == ([], [])
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from data_processor.interval_index import IntervalIndex
+
+
+def _contains(
+	interval: tuple[int, int],
+	start: int,
+	end: int
+) -> bool:
+	return interval[0] <= start and end <= interval[1]
+
+
+def test_empty_index() -> None:
+	index = IntervalIndex([])
+
+	assert len(index) == 0
+	assert index.find_containing(0, 1) is None
+
+
+def test_nested_and_disjoint_intervals() -> None:
+	intervals = [(100, 200), (0, 50), (120, 150), (10, 500)]
+	index = IntervalIndex(intervals)
+
+	assert index.find_containing(20, 40) in (1, 3)
+	assert index.find_containing(130, 140) in (0, 2, 3)
+	assert index.find_containing(300, 500) == 3
+	assert index.find_containing(5, 20) == 1
+	assert index.find_containing(40, 60) == 3
+	assert index.find_containing(400, 501) is None
+
+
+def test_interval_spanning_a_gap_is_not_contained() -> None:
+	index = IntervalIndex([(100, 200), (0, 50)])
+
+	assert index.find_containing(40, 60) is None
+	assert index.find_containing(40, 150) is None
+	assert index.find_containing(150, 200) == 0
+
+
+def test_bounds_are_inclusive() -> None:
+	index = IntervalIndex([(10, 20)])
+
+	assert index.find_containing(10, 20) == 0
+	assert index.find_containing(9, 20) is None
+	assert index.find_containing(10, 21) is None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_linear_scan(seed: int) -> None:
+	rng = random.Random(seed)
+	intervals = []
+	for _ in range(rng.randint(1, 40)):
+		start = rng.randint(0, 1000)
+		intervals.append((start, start + rng.randint(0, 300)))
+	index = IntervalIndex(intervals)
+
+	for _ in range(500):
+		start = rng.randint(0, 1200)
+		end = start + rng.randint(0, 200)
+		found = index.find_containing(start, end)
+
+		if any(_contains(interval, start, end) for interval in intervals):
+			assert found is not None
+			assert _contains(intervals[found], start, end)
+		else:
+			assert found is None
@@ -0,0 +1,60 @@
+from itertools import product
+from pathlib import Path
+
+import pytest
+from transformers import BertTokenizer
+
+from utils.kmer_encoder import KmerEncoder
+
+K = 3
+
+
+@pytest.fixture(scope="module")
+def tokenizer(tmp_path_factory: pytest.TempPathFactory) -> BertTokenizer:
+	path: Path = tmp_path_factory.mktemp("dnabert") / "vocab.txt"
+	vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + ["".join(kmer) for kmer in product("ACGT", repeat=K)]
+	path.write_text("\n".join(vocab) + "\n")
+
+	return BertTokenizer(str(path), do_lower_case=False)
+
+
+def _reference(
+	tokenizer: BertTokenizer,
+	sequence: str,
+	stride: int
+) -> list[int]:
+	sequence = sequence.upper()
+	if stride == K and len(sequence) % K:
+		sequence += "N" * (K - len(sequence) % K)
+
+	kmers = [sequence[i:i + K] for i in range(0, len(sequence) - K + 1, stride)]
+	return tokenizer.convert_tokens_to_ids(kmers)
+
+
+@pytest.mark.parametrize("stride", [1, K])
+@pytest.mark.parametrize("sequence", ["", "A", "AC", "ACG", "ACGT", "acgtacgtaa", "ACGNTTAGCX", "GATTACAGATTACA"])
+def test_matches_naive_kmers(
+	tokenizer: BertTokenizer,
+	sequence: str,
+	stride: int
+) -> None:
+	encoder = KmerEncoder(tokenizer, k=K, stride=stride)
+
+	assert encoder.encode_sequence(sequence).tolist() == _reference(tokenizer, sequence, stride)
+
+
+def test_encode_adds_special_tokens_and_truncates(tokenizer: BertTokenizer) -> None:
+	encoder = KmerEncoder(tokenizer, k=K, stride=1)
+	sequence = "ACGTACGTACGT"
+
+	ids = encoder.encode(sequence)
+	assert ids == [tokenizer.cls_token_id] + _reference(tokenizer, sequence, 1) + [tokenizer.sep_token_id]
+
+	truncated = encoder.encode(sequence, max_length=6)
+	assert len(truncated) == 6
+	assert truncated[1:-1] == ids[1:5]
+
+
+def test_rejects_other_strides(tokenizer: BertTokenizer) -> None:
+	with pytest.raises(ValueError):
+		KmerEncoder(tokenizer, k=K, stride=2)
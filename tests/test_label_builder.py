@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processor.label_builder import (build_label_tracks, build_targets,
+                                          split_label_tracks)
+
+
+def _reference(
+	length: int,
+	intervals: list[tuple[int, int, str]]
+) -> str:
+	target = np.full(length, "U")
+	for label in ("intron", "exon"):
+		for start, end, kind in intervals:
+			if kind.lower().startswith(label):
+				target[max(start, 0):max(end, 0)] = label[0].upper()
+
+	return "".join(target)
+
+
+def test_single_track() -> None:
+	labels, offsets = build_label_tracks([10], [0, 0], [2, 6], [5, 9], ["EXON", "intron"])
+
+	assert offsets.tolist() == [0, 10]
+	assert split_label_tracks(labels, offsets) == ["UUEEEUIIIU"]
+
+
+def test_exon_wins_over_overlapping_intron() -> None:
+	labels, offsets = build_label_tracks([8], [0, 0], [0, 2], [5, 8], ["exon", "intron"])
+
+	assert split_label_tracks(labels, offsets) == ["EEEEEIII"]
+
+
+def test_intervals_are_clipped_to_their_sequence() -> None:
+	labels, offsets = build_label_tracks([4, 3], [0, 1], [2, -5], [50, 2], ["exon", "intron"])
+
+	assert split_label_tracks(labels, offsets) == ["UUEE", "IIU"]
+
+
+def test_unknown_types_and_empty_tracks() -> None:
+	labels, offsets = build_label_tracks([0, 3], [1], [0], [3], ["CDS"])
+
+	assert split_label_tracks(labels, offsets) == ["", "UUU"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_per_row_painting(seed: int) -> None:
+	rng = np.random.default_rng(seed)
+	lengths = rng.integers(0, 300, size=40)
+
+	owners, starts, ends, types = [], [], [], []
+	for owner, length in enumerate(lengths):
+		for _ in range(rng.integers(0, 6)):
+			start = int(rng.integers(0, length + 1))
+			owners.append(owner)
+			starts.append(start)
+			ends.append(start + int(rng.integers(0, 80)))
+			types.append(str(rng.choice(["exon", "Exon", "INTRON", "intron", "other"])))
+
+	labels, offsets = build_label_tracks(lengths, owners, starts, ends, types)
+
+	expected = [
+		_reference(int(length), [
+			(start, end, kind)
+			for owner, start, end, kind in zip(owners, starts, ends, types)
+			if owner == index
+		])
+		for index, length in enumerate(lengths)
+	]
+	assert split_label_tracks(labels, offsets) == expected
+
+
+def test_build_targets_ignores_unknown_accessions() -> None:
+	dna_df = pd.DataFrame({
+		"dna_accession": ["A", "B"],
+		"sequence": ["ACGTAC", "ACG"]
+	})
+	exin_df = pd.DataFrame({
+		"dna_accession": ["B", "A", "C"],
+		"start": [0, 1, 0],
+		"end": [2, 3, 5],
+		"type": ["intron", "exon", "exon"]
+	})
+
+	assert build_targets(dna_df, exin_df) == ["UEEUUU", "IIU"]
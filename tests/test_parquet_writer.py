@@ -0,0 +1,143 @@
+import random
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from data_processor.parquet_writer import (SCHEMAS, ParquetDatasetWriter,
+                                           drop_accessions, next_partition,
+                                           partition_path)
+from schemas.tables_data import DNASequence
+
+
+def _record(
+	rng: random.Random,
+	index: int
+) -> DNASequence:
+	sequence = "".join(rng.choice("ACGT") for _ in range(rng.randint(20, 80)))
+
+	return {
+		"sequence": sequence,
+		"accession": f"ACC{index:04d}",
+		"organism": rng.choice(["Homo sapiens", "Mus musculus"]),
+		"cds": [
+			{"sequence": sequence[2:10], "start": 2, "end": 10, "gene": f"G{index}"}
+			for _ in range(rng.randint(0, 2))
+		],
+		"exin": [
+			{
+				"sequence": sequence[3:6],
+				"type": rng.choice(["EXON", "INTRON"]),
+				"start": 3,
+				"end": 6,
+				"gene": f"G{index}",
+				"strand": rng.choice([1, -1]),
+				"before": sequence[:3],
+				"after": sequence[6:9],
+				"cds_index": 0
+			}
+			for _ in range(rng.randint(0, 3))
+		]
+	}
+
+
+def _rows(
+	records: list[DNASequence],
+	name: str
+) -> list[dict]:
+	if name == "dna":
+		return [
+			{"dna_accession": record["accession"], "organism": record["organism"], "sequence": record["sequence"]}
+			for record in records
+		]
+
+	return [
+		{"dna_accession": record["accession"], **row}
+		for record in records
+		for row in record[name]
+	]
+
+
+def _read(
+	output_dir: Path,
+	name: str
+) -> list[dict]:
+	frame = pd.read_parquet(output_dir / name)
+	for column in frame.columns:
+		if isinstance(frame[column].dtype, pd.CategoricalDtype):
+			frame[column] = frame[column].astype(object)
+
+	return sorted(frame.to_dict("records"), key=lambda row: tuple(row.values()))
+
+
+@pytest.fixture
+def records() -> list[DNASequence]:
+	rng = random.Random(0)
+	return [_record(rng, i) for i in range(23)]
+
+
+def test_round_trip(
+	tmp_path: Path,
+	records: list[DNASequence]
+) -> None:
+	with ParquetDatasetWriter(tmp_path, chunk_size=3, records_per_partition=5) as writer:
+		for record in records:
+			writer.write(record)
+
+	for name in SCHEMAS:
+		expected = sorted(_rows(records, name), key=lambda row: tuple(row.values()))
+		assert _read(tmp_path, name) == expected
+
+
+def test_partition_layout(
+	tmp_path: Path,
+	records: list[DNASequence]
+) -> None:
+	with ParquetDatasetWriter(tmp_path, chunk_size=3, records_per_partition=5) as writer:
+		for record in records:
+			writer.write(record)
+
+	partitions = sorted(set(writer.accession_partitions.values()))
+	assert partitions == [0, 1, 2, 3]
+	assert next_partition(tmp_path) == 4
+
+	for partition in partitions:
+		path = partition_path(tmp_path, "dna", partition)
+		accessions = set(pq.read_table(path)["dna_accession"].to_pylist())
+		assert accessions == {
+			accession
+			for accession, owner in writer.accession_partitions.items()
+			if owner == partition
+		}
+		assert pq.read_schema(path) == SCHEMAS["dna"]
+
+
+def test_start_partition_and_skipped_dna(
+	tmp_path: Path,
+	records: list[DNASequence]
+) -> None:
+	with ParquetDatasetWriter(tmp_path, start_partition=7) as writer:
+		for record in records[:4]:
+			writer.write(record, write_dna=False)
+
+	assert set(writer.accession_partitions.values()) == {7}
+	assert not partition_path(tmp_path, "dna", 7).exists()
+	assert len(_read(tmp_path, "exin")) == len(_rows(records[:4], "exin"))
+
+
+def test_drop_accessions(
+	tmp_path: Path,
+	records: list[DNASequence]
+) -> None:
+	with ParquetDatasetWriter(tmp_path, chunk_size=3, records_per_partition=5) as writer:
+		for record in records:
+			writer.write(record)
+
+	dropped = {record["accession"] for record in records[:6]} | {records[-1]["accession"]}
+	partitions = {writer.accession_partitions[accession] for accession in dropped}
+	drop_accessions(tmp_path, partitions, dropped)
+
+	assert not partition_path(tmp_path, "dna", 0).exists()
+	kept = [record for record in records if record["accession"] not in dropped]
+	assert [row["dna_accession"] for row in _read(tmp_path, "dna")] == [record["accession"] for record in kept]
@@ -0,0 +1,173 @@
+import random
+from pathlib import Path
+
+import pytest
+from fixtures import build_bert, build_gpt2
+
+from llms.dna_translator.gpt import DnaTranslatorGPT
+from llms.exin_classifier.bert import ExInClassifierBERT
+from llms.exin_classifier.gpt import ExInClassifierGPT
+from llms.nucl_classifier.bert import NUCLEOTIDE_MAP, NuclBERT
+from utils.prompt_encoder import IUPAC_NUCLEOTIDES
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWYX"
+
+
+@pytest.fixture(scope="module")
+def checkpoints(tmp_path_factory: pytest.TempPathFactory) -> dict[str, str]:
+	path: Path = tmp_path_factory.mktemp("checkpoints")
+
+	return {
+		"bert": str(build_bert(path / "bert")),
+		"gpt2": str(build_gpt2(path / "gpt2"))
+	}
+
+
+@pytest.fixture
+def rng() -> random.Random:
+	return random.Random(0)
+
+
+def _dna(
+	rng: random.Random,
+	length: int
+) -> str:
+	return "".join(rng.choice(IUPAC_NUCLEOTIDES + IUPAC_NUCLEOTIDES.lower()) for _ in range(length))
+
+
+def _symbols(
+	sequence: str,
+	template: str
+) -> str:
+	return "".join(template.format(symbol.upper()) for symbol in sequence)
+
+
+def test_exin_bert_matches_string_prompt(
+	checkpoints: dict[str, str],
+	rng: random.Random
+) -> None:
+	model = ExInClassifierBERT(checkpoint=checkpoints["bert"], log_level="WARNING")
+
+	for _ in range(10):
+		data = {
+			"sequence": _dna(rng, rng.randint(1, 600)),
+			"target": "EXON",
+			"organism": "Homo Sapiens",
+			"gene": "BRCA1-Long-Name",
+			"before": _dna(rng, 5),
+			"after": _dna(rng, 5)
+		}
+		text = (
+			f"<|SEQUENCE|>{_symbols(data['sequence'], '[{}]')}"
+			f"<|ORGANISM|>{data['organism'][:10].lower()}"
+			f"<|GENE|>{data['gene'][:10].lower()}"
+			f"<|FLANK_BEFORE|>{_symbols(data['before'], '[{}]')}"
+			f"<|FLANK_AFTER|>{_symbols(data['after'], '[{}]')}"
+			"<|TARGET|>"
+		)
+
+		input_ids, _ = model._build_input(data, hide_prob=0.0)
+		assert input_ids == model.tokenizer(text, truncation=True, max_length=model.max_length)["input_ids"]
+
+
+def test_exin_gpt_matches_string_prompt(
+	checkpoints: dict[str, str],
+	rng: random.Random
+) -> None:
+	model = ExInClassifierGPT(checkpoint=checkpoints["gpt2"], log_level="WARNING")
+
+	for target in ("EXON", "INTRON", None):
+		sequence, before, after = _dna(rng, 80), _dna(rng, 6), _dna(rng, 6)
+		text = (
+			f"<|SEQUENCE|>{_symbols(sequence, '[{}]')}\n"
+			"<|ORGANISM|>Mus muscul\n"
+			"<|GENE|>ABC\n"
+			f"<|FLANK_BEFORE|>{_symbols(before, '[{}]')}\n"
+			f"<|FLANK_AFTER|>{_symbols(after, '[{}]')}\n"
+			"<|TARGET|>"
+		)
+
+		prompt = model._build_input(
+			sequence,
+			target=target,
+			organism="Mus musculus",
+			gene="ABC",
+			before=before,
+			after=after,
+			hide_prob=0.0
+		)
+		assert prompt["partial"] == model.tokenizer(text)["input_ids"]
+		assert prompt["complete"] == model.tokenizer(text + (f"[{target}]" if target else ""))["input_ids"]
+
+
+def test_nucl_bert_matches_string_prompt(
+	checkpoints: dict[str, str],
+	rng: random.Random
+) -> None:
+	model = NuclBERT(checkpoint=checkpoints["bert"], log_level="WARNING")
+	sequence = _dna(rng, 60) + "xz-"
+
+	def process(part: str) -> str:
+		return "".join(NUCLEOTIDE_MAP.get(symbol, "[DNA_INVALID]") for symbol in part.upper())
+
+	sequence_ids = model._process_sequence(sequence)
+	for organism in ("Homo sapiens", None):
+		for position in (0, 1, 30, len(sequence) - 1):
+			before = sequence[max(position - model.flank_size, 0):position]
+			after = sequence[position + 1:min(position + model.flank_size, len(sequence))]
+			text = (
+				f"<|SEQUENCE|>{process(sequence[position])}"
+				f"<|FLANK_BEFORE|>{process(before)}"
+				f"<|FLANK_AFTER|>{process(after)}"
+				+ (f"<|ORGANISM|>{organism[:10].lower()}" if organism else "")
+				+ "<|TARGET|>"
+			)
+
+			input_ids = model._build_input(sequence_ids, position, model._organism_ids(organism))
+			assert input_ids == model.tokenizer(text, truncation=True, max_length=model.max_length)["input_ids"]
+
+
+def test_dna_translator_matches_string_prompt(
+	checkpoints: dict[str, str],
+	rng: random.Random
+) -> None:
+	model = DnaTranslatorGPT(checkpoint=checkpoints["gpt2"], log_level="WARNING")
+
+	for target in ("MKT*AY", "".join(rng.choice(AMINO_ACIDS) for _ in range(30)), None):
+		sequence = _dna(rng, 90)
+		text = f"<|DNA|>{_symbols(sequence, '[DNA_{}]')}<|ORGANISM|>Escherichi<|PROTEIN|>"
+
+		prompt = model._build_input(sequence, target=target, organism="Escherichia coli")
+		assert prompt["partial"] == model.tokenizer(text)["input_ids"]
+
+		completion = ""
+		if target:
+			protein = (target + "*")[:(target + "*").find("*") + 1]
+			completion = _symbols(protein, "[PROT_{}]") + model.eos_token
+		assert prompt["complete"] == model.tokenizer(text + completion)["input_ids"]
+
+
+def test_dna_translator_truncates_only_the_dna(
+	checkpoints: dict[str, str],
+	rng: random.Random
+) -> None:
+	model = DnaTranslatorGPT(checkpoint=checkpoints["gpt2"], log_level="WARNING")
+	sequence = _dna(rng, 200)
+	full = model._build_input(sequence, organism="Escherichia coli")["partial"]
+	suffix = model.tokenizer("<|ORGANISM|>Escherichi<|PROTEIN|>")["input_ids"]
+
+	prompt = model._build_input(sequence, organism="Escherichia coli", max_length=50)["partial"]
+
+	assert len(prompt) == 50
+	assert prompt[-len(suffix):] == suffix
+	assert prompt[:-len(suffix)] == full[:50 - len(suffix)]
+
+
+def test_dna_translator_learns_eos(checkpoints: dict[str, str]) -> None:
+	model = DnaTranslatorGPT(checkpoint=checkpoints["gpt2"], log_level="WARNING")
+	eos_token_id = model.tokenizer.convert_tokens_to_ids(model.eos_token)
+
+	(example,) = model._generate_examples([{"sequence": "ATGAAA", "target": "MK", "organism": None}])
+
+	assert example["labels"][-1] == eos_token_id
+	assert example["labels"][-4:] == example["input_ids"][-4:]
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+from data_processor.raw_extractor import split_records
+
+
+def _record(
+	accession: str,
+	lines: int
+) -> str:
+	body = "".join(f"        {i} acgtacgtac gtacgtacgt\n" for i in range(lines))
+	return f"LOCUS       {accession}\nORIGIN\n{body}//\n"
+
+
+@pytest.fixture
+def annotations(tmp_path: Path) -> Path:
+	path = tmp_path / "records.gb"
+	path.write_text("".join(_record(f"ACC{i}", i % 7 + 1) for i in range(25)))
+	return path
+
+
+@pytest.mark.parametrize("num_shards", [1, 2, 3, 8, 25, 100])
+def test_shards_cover_file_without_gaps(
+	annotations: Path,
+	num_shards: int
+) -> None:
+	shards = split_records(str(annotations), num_shards)
+
+	assert 1 <= len(shards) <= num_shards
+	assert shards[0][0] == 0
+	assert shards[-1][1] == annotations.stat().st_size
+	for (_, end), (start, _) in zip(shards, shards[1:]):
+		assert end == start
+
+
+@pytest.mark.parametrize("num_shards", [2, 3, 8, 25, 100])
+def test_shards_end_on_record_boundaries(
+	annotations: Path,
+	num_shards: int
+) -> None:
+	data = annotations.read_bytes()
+
+	records = []
+	for start, end in split_records(str(annotations), num_shards):
+		chunk = data[start:end]
+		assert chunk.startswith(b"LOCUS")
+		assert chunk.endswith(b"//\n")
+		records.extend(line for line in chunk.splitlines() if line.startswith(b"LOCUS"))
+
+	assert records == [f"LOCUS       ACC{i}".encode() for i in range(25)]
+
+
+def test_single_record_is_one_shard(tmp_path: Path) -> None:
+	path = tmp_path / "single.gb"
+	path.write_text(_record("ACC0", 3))
+
+	assert split_records(str(path), 4) == [(0, path.stat().st_size)]
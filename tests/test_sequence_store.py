@@ -0,0 +1,87 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+from transformers import BertTokenizer
+
+from data_processor.sequence_store import SequenceStore, SequenceStoreWriter
+from utils.prompt_encoder import IUPAC_NUCLEOTIDES, PromptEncoder
+
+
+@pytest.fixture
+def sequences() -> dict[str, str]:
+	rng = random.Random(0)
+	sequences = {
+		"empty": "",
+		"short": "ACG",
+		"ambiguous": "NNACGTRYNN",
+		"lower": "acgtnacgt"
+	}
+	for i in range(20):
+		alphabet = "ACGT" * 20 + IUPAC_NUCLEOTIDES
+		sequences[f"random{i}"] = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 700)))
+
+	return sequences
+
+
+@pytest.fixture
+def store(
+	tmp_path: Path,
+	sequences: dict[str, str]
+) -> SequenceStore:
+	with SequenceStoreWriter(tmp_path / "store") as writer:
+		for accession, sequence in sequences.items():
+			writer.add(accession, sequence)
+
+	return SequenceStore(tmp_path / "store")
+
+
+def test_round_trip(
+	store: SequenceStore,
+	sequences: dict[str, str]
+) -> None:
+	assert len(store) == len(sequences)
+	assert store.accessions == list(sequences)
+
+	for accession, sequence in sequences.items():
+		assert accession in store
+		assert store.length(accession) == len(sequence)
+		assert store.fetch(accession) == sequence.upper()
+
+
+def test_slices(
+	store: SequenceStore,
+	sequences: dict[str, str]
+) -> None:
+	rng = random.Random(1)
+	for accession, sequence in sequences.items():
+		for _ in range(20):
+			start = rng.randint(-5, len(sequence) + 5)
+			end = rng.randint(-5, len(sequence) + 5)
+			assert store.fetch(accession, start, end) == sequence.upper()[start:end]
+
+
+def test_duplicate_accession(tmp_path: Path) -> None:
+	with SequenceStoreWriter(tmp_path / "store") as writer:
+		writer.add("A", "ACGT")
+		with pytest.raises(ValueError):
+			writer.add("A", "ACGT")
+
+
+def test_fetch_ids(
+	tmp_path: Path,
+	store: SequenceStore,
+	sequences: dict[str, str]
+) -> None:
+	tokens = [f"[{nucl}]" for nucl in IUPAC_NUCLEOTIDES]
+	(tmp_path / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]"] + tokens) + "\n")
+	tokenizer = BertTokenizer(str(tmp_path / "vocab.txt"))
+	tokenizer.add_tokens(tokens, special_tokens=True)
+	encoder = PromptEncoder(tokenizer, {nucl: f"[{nucl}]" for nucl in IUPAC_NUCLEOTIDES})
+
+	for accession, sequence in sequences.items():
+		np.testing.assert_array_equal(
+			store.fetch_ids(accession, encoder, 2, 50),
+			encoder.encode_sequence(sequence[2:50])
+		)